@@ -0,0 +1,50 @@
+"""Micro-benchmark for the waveform dtype.
+
+This script compares the memory footprint and the conversion
+throughput of float64 and float32 waveforms, for the raw sample
+types of the binary transfer formats. The time base is always float64.
+
+Run:
+
+    $ python benchmark/dtype.py [length]
+"""
+
+# Imports
+import sys
+import numpy
+import timeit
+from scopedevice.waveform import convert_waveform
+
+# Constants
+NUMBER = 20
+LENGTH = 10**7
+RAW_DTYPES = ("int8", "int16")
+WAVEFORM_DTYPES = ("float64", "float32")
+
+
+# Benchmark function
+def bench(length, raw_dtype, dtype):
+    """Return the array size in MB and the conversion rate in MS/s."""
+    info = numpy.iinfo(raw_dtype)
+    raw = numpy.random.randint(info.min, info.max, length).astype(raw_dtype)
+    waveform = convert_waveform(raw, 0.01, 0.5, dtype)
+    delay = timeit.timeit(
+        lambda: convert_waveform(raw, 0.01, 0.5, dtype), number=NUMBER)
+    return waveform.nbytes / 1e6, length * NUMBER / delay / 1e6
+
+
+# Main function
+def main(length=LENGTH):
+    print("{0} samples per waveform".format(length))
+    msg = "{0:>6} -> {1:<8} {2:8.1f} MB {3:8.1f} MS/s"
+    for raw_dtype in RAW_DTYPES:
+        for dtype in WAVEFORM_DTYPES:
+            size, rate = bench(length, raw_dtype, dtype)
+            print(msg.format(raw_dtype, dtype, size, rate))
+    size = numpy.linspace(0, 1, length).nbytes / 1e6
+    print("time base float64  {0:8.1f} MB".format(size))
+
+
+# Main execution
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
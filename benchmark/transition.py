@@ -0,0 +1,60 @@
+"""Micro-benchmark for the state transition latency.
+
+Each state transition reloads the event properties of the device.
+This script compares the former dir() scan with the registry
+built by DeviceMeta.
+
+Run:
+
+    $ python benchmark/transition.py
+"""
+
+# Imports
+import timeit
+from PyTango import DevState
+from scopedevice import RTOScope
+
+# Constants
+NUMBER = 1000
+
+
+# Device stub
+class BenchScope(RTOScope):
+    """RTO scope that does not require a running server."""
+
+    next_state = None
+
+    def get_state(self):
+        return DevState.ON
+
+
+# Former implementation
+def scan_update_attributes(device, reset=False):
+    """Reload the attributes by scanning the class."""
+    cls = type(device)
+    for name in dir(cls):
+        try:
+            getattr(cls, name).reloader(device, reset)
+        except AttributeError:
+            pass
+
+
+# Current implementation
+def registry_update_attributes(device, reset=False):
+    """Reload the attributes using the class registry."""
+    BenchScope.update_attributes.im_func(device, reset)
+
+
+# Main function
+def main():
+    device = BenchScope.__new__(BenchScope)
+    print("{0} event properties".format(len(BenchScope.event_properties)))
+    for func in (scan_update_attributes, registry_update_attributes):
+        delay = timeit.timeit(lambda: func(device), number=NUMBER)
+        msg = "{0}: {1:.1f} us per transition"
+        print(msg.format(func.__name__, delay / NUMBER * 1e6))
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
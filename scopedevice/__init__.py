@@ -1,9 +1,11 @@
 """Package for scope device servers."""
 
 __all__ = ['ScopeDevice', 'RTOScope', "RTMScope",
-           'run_rto', 'run_rtm', 'run', 'RTO_NAME', 'RTM_NAME']
+           'run_rto', 'run_rtm', 'run', 'RTO_NAME', 'RTM_NAME',
+           'decode_waveform']
 
 from scopedevice.device import ScopeDevice
 from scopedevice.rtm import RTMScope
 from scopedevice.rto import RTOScope
 from scopedevice.server import RTO_NAME, RTM_NAME, run_rto, run_rtm, run
+from scopedevice.encoding import decode_waveform
@@ -1,15 +1,19 @@
 """Common functions for the scope devices."""
 
 # Imports
+import os
 import sys
 import time
+import ctypes
 import weakref
 import PyTango
 import threading
 import functools
+import itertools
 import traceback
 import contextlib
 import collections
+from Queue import Queue
 
 # PyTango imports
 from PyTango import server
@@ -20,6 +24,64 @@ _stamped = collections.namedtuple("stamped", ("value", "stamp", "quality"))
 stamped = functools.partial(_stamped, quality=AttrQuality.ATTR_VALID)
 
 
+# SCPI helpers
+def join_commands(commands):
+    """Join SCPI commands into a single message.
+
+    Each command is given from the root of the command tree,
+    except for the common commands (e.g. *OPC?).
+    """
+    commands = (command.strip().lstrip(":") for command in commands)
+    return ";".join(command if command.startswith("*") else ":" + command
+                    for command in commands)
+
+
+def split_reply(reply, count):
+    """Split the reply to a message containing several queries."""
+    replies = str(reply).strip().split(";")
+    if len(replies) != count:
+        msg = "Expected {0} replies, got {1}: {2!r}"
+        raise ValueError(msg.format(count, len(replies), reply))
+    return replies
+
+
+def scpi_int(reply):
+    """Parse an integer SCPI reply, possibly in scientific notation."""
+    return int(float(reply))
+
+
+def scpi_bool(reply):
+    """Parse a boolean SCPI reply."""
+    reply = reply.strip().upper()
+    if reply in ("1", "ON"):
+        return True
+    if reply in ("0", "OFF"):
+        return False
+    raise ValueError("Not a boolean reply: {0!r}".format(reply))
+
+
+def scpi_enum(*mnemonics):
+    """Return a parser converting SCPI mnemonics to their index.
+
+    Both long and short forms are accepted (e.g. POSitive or POS).
+    Use None to skip an index.
+    """
+    table = {}
+    for index, mnemonic in enumerate(mnemonics):
+        if mnemonic is None:
+            continue
+        short = "".join(char for char in mnemonic if not char.islower())
+        table[short] = table[mnemonic.upper()] = index
+
+    def parse(reply):
+        reply = reply.strip().strip('"').upper()
+        try:
+            return table[reply]
+        except KeyError:
+            raise ValueError("Unexpected reply: {0!r}".format(reply))
+    return parse
+
+
 # Tango objects
 def is_tango_object(arg):
     """Return tango data if the argument is a tango object,
@@ -67,14 +129,35 @@ def inheritance_patch(attrs):
                     obj.fset = attrs.get(method_name)
 
 
+# Event property registry
+def get_event_properties(cls):
+    """Return the event properties of a class, inheritance included,
+    in definition order.
+    """
+    properties = {}
+    for base in reversed(cls.__mro__):
+        for key, value in vars(base).items():
+            if isinstance(value, event_property):
+                properties[key] = value
+            else:
+                properties.pop(key, None)
+    return tuple(sorted(set(properties.values()),
+                        key=lambda prop: prop.index))
+
+
 # DeviceMeta metaclass
 def DeviceMeta(name, bases, attrs):
     """Enhanced version of PyTango.server.DeviceMeta
     that supports inheritance.
+
+    It also registers the event properties of the class
+    in the `event_properties` tuple.
     """
     # Compatibility >= 8.1.8
     if PyTango.__version_info__ >= (8, 1, 8):
-        return PyTango.server.DeviceMeta(name, bases, attrs)
+        cls = PyTango.server.DeviceMeta(name, bases, attrs)
+        cls.event_properties = get_event_properties(cls)
+        return cls
     # Attribute dictionary
     dct = {"run_server": run_server}
     # Filter object from bases
@@ -94,6 +177,7 @@ def DeviceMeta(name, bases, attrs):
     # Create device class
     cls = PyTango.server.DeviceMeta(name, bases, dct)
     cls.TangoClassName = name
+    cls.event_properties = get_event_properties(cls)
     return cls
 
 
@@ -151,15 +235,192 @@ class LockEvent(threading._Condition, threading._Event):
             threading._Event.clear(self)
 
 
-# Tick context
-@contextlib.contextmanager
-def tick_context(value):
-    """Generate a context that controls the duration of its execution."""
-    start = time.time()
-    yield
-    sleep_time = start + value - time.time()
-    if sleep_time > 0:
-        time.sleep(sleep_time)
+# Acquisition queue
+class AcquisitionQueue(Queue):
+    """Bounded queue with a configurable overflow policy.
+
+    The available policies are:
+     - "block": the producer waits for some room in the queue
+     - "drop_oldest": the oldest items are discarded to make room
+     - "keep_latest": all the pending items are discarded
+
+    The number of discarded items is available as `dropped`.
+    """
+
+    policies = ("block", "drop_oldest", "keep_latest")
+
+    def __init__(self, maxsize=0, policy="block"):
+        """Initialize the queue."""
+        if policy not in self.policies:
+            msg = "Invalid queue policy: {0!r} (expected one of {1})"
+            raise ValueError(msg.format(policy, ", ".join(self.policies)))
+        Queue.__init__(self, maxsize)
+        self.policy = policy
+        self.dropped = 0
+
+    def put(self, item, block=True, timeout=None):
+        """Put an item in the queue according to the policy."""
+        if self.policy == "block":
+            return Queue.put(self, item, block, timeout)
+        with self.not_full:
+            if self.policy == "keep_latest":
+                self.discard(self._qsize())
+            elif self.maxsize > 0:
+                self.discard(self._qsize() - self.maxsize + 1)
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def discard(self, count):
+        """Discard the given number of items (the lock must be held)."""
+        for _ in range(count):
+            self._get()
+            self.unfinished_tasks -= 1
+            self.dropped += 1
+
+    def interrupt(self):
+        """Put a None item in the queue, regardless of its size."""
+        with self.not_full:
+            self._put(None)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+# Monotonic clock
+class _timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+def _clock_gettime_monotonic():
+    """Return a monotonic clock based on clock_gettime, if available."""
+    try:
+        librt = ctypes.CDLL("librt.so.1", use_errno=True)
+        clock_gettime = librt.clock_gettime
+    except (OSError, AttributeError):
+        return None
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+    timespec = _timespec()
+
+    def monotonic():
+        """Return the value of the CLOCK_MONOTONIC clock in seconds."""
+        if clock_gettime(1, ctypes.byref(timespec)):
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return timespec.tv_sec + timespec.tv_nsec * 1e-9
+    return monotonic
+
+
+try:
+    from time import monotonic
+except ImportError:
+    monotonic = _clock_gettime_monotonic() or time.time
+
+
+# Deadline scheduler
+class ScheduledTask(object):
+    """Periodic task of a DeadlineScheduler, with its timing statistics.
+
+    The jitter is the delay between the deadline and the actual start,
+    and an overrun is registered when the next deadline has already
+    passed once the task is done.
+    """
+
+    def __init__(self, name, func, period, priority=0, enabled=None):
+        """Initialize the task."""
+        self.name = name
+        self.func = func
+        self.period = period
+        self.priority = priority
+        self.enabled = enabled
+        self.deadline = None
+        self.runs = 0
+        self.overruns = 0
+        self.jitter = 0.0
+        self.total_jitter = 0.0
+        self.max_jitter = 0.0
+        self.duration = 0.0
+
+    @property
+    def mean_jitter(self):
+        return self.total_jitter / self.runs if self.runs else 0.0
+
+    def is_enabled(self):
+        return self.enabled is None or self.enabled()
+
+    def run(self, now, clock):
+        """Run the task and schedule the next deadline."""
+        self.jitter = now - self.deadline
+        self.total_jitter += self.jitter
+        self.max_jitter = max(self.max_jitter, self.jitter)
+        self.runs += 1
+        try:
+            self.func()
+        finally:
+            end = clock()
+            self.duration = end - now
+            self.deadline += self.period
+            if self.period and self.deadline <= end:
+                self.overruns += 1
+                missed = (end - self.deadline) // self.period + 1
+                self.deadline += missed * self.period
+
+
+class DeadlineScheduler(object):
+    """Run periodic tasks at their deadline on a monotonic clock.
+
+    The deadlines are computed from the previous ones, so the schedule
+    does not drift. When several tasks are due, they run in priority
+    order (lowest value first). A disabled task is rescheduled as soon
+    as it is enabled again. The `wakeup` event interrupts the wait
+    for the next deadline.
+    """
+
+    def __init__(self, clock=monotonic):
+        """Initialize the scheduler."""
+        self.clock = clock
+        self.tasks = []
+        self.wakeup = threading.Event()
+
+    def add(self, name, func, period, priority=0, enabled=None):
+        """Add a task and return it."""
+        task = ScheduledTask(name, func, period, priority, enabled)
+        self.tasks.append(task)
+        return task
+
+    def run_pending(self, handler=None):
+        """Run the due tasks, passing their exceptions to the handler."""
+        now = self.clock()
+        due = []
+        for task in self.tasks:
+            if not task.is_enabled():
+                task.deadline = None
+                continue
+            if task.deadline is None:
+                task.deadline = now
+            if task.deadline <= now:
+                due.append(task)
+        for task in sorted(due, key=lambda task: task.priority):
+            try:
+                task.run(self.clock(), self.clock)
+            except Exception as exc:
+                if handler is None:
+                    raise
+                handler(exc)
+
+    def next_deadline(self):
+        """Return the earliest deadline of the enabled tasks, or None."""
+        deadlines = [task.deadline for task in self.tasks
+                     if task.deadline is not None and task.is_enabled()]
+        return min(deadlines) if deadlines else None
+
+    def wait(self):
+        """Wait for the next deadline or for the wakeup event."""
+        deadline = self.next_deadline()
+        if deadline is not None:
+            timeout = deadline - self.clock()
+            if timeout > 0:
+                self.wakeup.wait(timeout)
+        self.wakeup.clear()
 
 
 # Safe traceback
@@ -196,6 +457,106 @@ class StopIO(Exception):
     pass
 
 
+class Preempted(StopIO):
+    """Exception raised to interrupt a wait in favor of pending requests."""
+    pass
+
+
+# Request queue items
+class Request(object):
+    """Task of the request queue, stamped when enqueued.
+
+    A keyed request is replaced by a newer request with the same key
+    until it starts. The unkeyed requests act as barriers: a keyed
+    request is never replaced by a request enqueued after a barrier.
+    """
+
+    counter = itertools.count()
+
+    def __init__(self, func, args, kwargs, key=None):
+        """Initialize the request."""
+        self.task = func, args, kwargs
+        self.key = key
+        self.index = next(self.counter)
+        self.stamp = time.time()
+
+
+class QueueStatistics(object):
+    """Latency statistics of the request queue."""
+
+    def __init__(self):
+        """Initialize the statistics."""
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self.coalesced = 0
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, latency):
+        """Register the latency of a request."""
+        self.count += 1
+        self.total += latency
+        self.last = latency
+        self.max = max(self.max, latency)
+
+
+# Request future
+class RequestTimeout(Exception):
+    """Exception raised when a request is not processed in time."""
+    pass
+
+
+class RequestFuture(object):
+    """Result of a task processed by the request queue."""
+
+    def __init__(self):
+        """Initialize the future."""
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.state = "pending"
+        self.value = None
+        self.exception = None
+
+    def start(self):
+        """Mark the task as running, unless it has been cancelled."""
+        with self.lock:
+            if self.state != "pending":
+                return False
+            self.state = "running"
+            return True
+
+    def cancel(self):
+        """Cancel the task, unless it is already running."""
+        with self.lock:
+            if self.state != "pending":
+                return False
+            self.state = "cancelled"
+            return True
+
+    def set_result(self, value=None, exception=None):
+        """Set the result of the task and wake up the waiting threads."""
+        self.value, self.exception = value, exception
+        self.state = "done"
+        self.done.set()
+
+    def result(self, timeout=None):
+        """Wait for the result of the task.
+
+        The task is cancelled if it has not started before the timeout.
+        """
+        if not self.done.wait(timeout):
+            self.cancel()
+            msg = "Request not processed in time ({0:3.1f} s)"
+            raise RequestTimeout(msg.format(timeout))
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+
 # RW attribute
 rw_attribute = functools.partial(
     attribute,
@@ -253,15 +614,28 @@ def debug_periodic_method(stream=None, track=10):
 
 # Event property
 class event_property(object):
-    """Property that pushes change events automatically."""
+    """Property that pushes change events automatically.
+
+    The value, stamp and quality are stored as a single immutable record
+    in a per-device slot table. Writers swap the record under a lock
+    while readers access it without locking.
+    """
 
     # Aliases
     INVALID = AttrQuality.ATTR_INVALID
     VALID = AttrQuality.ATTR_VALID
 
+    # Definition order
+    counter = itertools.count()
+
     def __init__(self, attribute, default=None, invalid=None,
-                 is_allowed=None, event=True, dtype=None, doc=None):
+                 is_allowed=None, event=True, dtype=None, doc=None,
+                 rate=None):
+        self.index = next(self.counter)
+        self.rate = rate
         self.lock_cache = weakref.WeakKeyDictionary()
+        self.allowed_cache = {}
+        self.attribute_name = None
         self.attribute = attribute
         self.default = default
         self.invalid = invalid
@@ -277,59 +651,44 @@ class event_property(object):
         return self.lock_cache.setdefault(device, threading.RLock())
 
     def get_attribute_name(self):
-        try:
-            return self.attribute.attr_name
-        except AttributeError:
-            return self.attribute
+        if self.attribute_name is None:
+            self.attribute_name = getattr(
+                self.attribute, "attr_name", self.attribute)
+        return self.attribute_name
 
-    def get_is_allowed_method(self, device):
-        if callable(self.is_allowed):
-            return self.is_allowed
-        if self.is_allowed:
-            return getattr(device, self.is_allowed)
-        name = "is_" + self.get_attribute_name() + "_allowed"
-        return getattr(device, name, None)
+    def get_is_allowed_function(self, device):
+        cls = type(device)
+        try:
+            return self.allowed_cache[cls]
+        except KeyError:
+            pass
+        if self.is_allowed and not callable(self.is_allowed):
+            name = self.is_allowed
+        else:
+            name = "is_" + self.get_attribute_name() + "_allowed"
+        func = getattr(cls, name, None)
+        return self.allowed_cache.setdefault(cls, func)
 
     def allowed(self, device):
-        is_allowed = self.get_is_allowed_method(device)
-        return not is_allowed or is_allowed(AttReqType.READ_REQ)
+        if callable(self.is_allowed):
+            return self.is_allowed(AttReqType.READ_REQ)
+        is_allowed = self.get_is_allowed_function(device)
+        return not is_allowed or is_allowed(device, AttReqType.READ_REQ)
 
     def event_enabled(self, device):
         if self.event and isinstance(self.event, basestring):
             return getattr(device, self.event)
         return self.event
 
-    def get_private_value(self, device):
-        name = "__" + self.get_attribute_name() + "_value"
-        return getattr(device, name)
-
-    def set_private_value(self, device, value):
-        name = "__" + self.get_attribute_name() + "_value"
-        setattr(device, name, value)
-
-    def get_private_quality(self, device):
-        name = "__" + self.get_attribute_name() + "_quality"
-        return getattr(device, name)
-
-    def set_private_quality(self, device, quality):
-        name = "__" + self.get_attribute_name() + "_quality"
-        setattr(device, name, quality)
-
-    def get_private_stamp(self, device):
-        name = "__" + self.get_attribute_name() + "_stamp"
-        return getattr(device, name)
-
-    def set_private_stamp(self, device, stamp):
-        name = "__" + self.get_attribute_name() + "_stamp"
-        setattr(device, name, stamp)
+    @staticmethod
+    def get_slots(device):
+        try:
+            return device.event_slots
+        except AttributeError:
+            return device.__dict__.setdefault("event_slots", {})
 
     def delete_all(self, device):
-        for suffix in ("_value", "_stamp", "_quality"):
-            name = "__" + self.get_attribute_name() + suffix
-            try:
-                delattr(device, name)
-            except AttributeError:
-                pass
+        self.get_slots(device).pop(self, None)
 
     @staticmethod
     def unpack(value):
@@ -427,24 +786,21 @@ class event_property(object):
     # Private attribute access
 
     def get_value(self, device, attr=None):
-        # Get value
-        with self.get_lock(device):
-            try:
-                value = self.get_private_value(device)
-                stamp = self.get_private_stamp(device)
-                quality = self.get_private_quality(device)
-            except AttributeError:
-                value = self.get_default_value(device)
-                stamp = time.time()
-                quality = self.get_default_quality()
+        # Get the current record (no lock needed)
+        record = self.get_slots(device).get(self)
+        if record is None:
+            record = _stamped(self.get_default_value(device),
+                              time.time(),
+                              self.get_default_quality())
         # Set value
         if attr:
-            attr.set_value_date_quality(value, stamp, quality)
+            attr.set_value_date_quality(*record)
         # Return
-        return value, stamp, quality
+        return record
 
     def set_value(self, device, value=None, stamp=None, quality=None,
                   disable_event=False):
+        # The lock only serializes the writers
         with self.get_lock(device):
             # Prepare
             old_value, old_stamp, old_quality = self.get_value(device)
@@ -457,20 +813,29 @@ class event_property(object):
             elif quality is None:
                 quality = old_quality
             # Test differences
-            diff = old_quality != quality or old_value != value
-            try:
-                bool(diff)
-            except ValueError:
-                diff = diff.any()
-            if not diff:
+            if old_quality == quality and not self.changed(old_value, value):
                 return
-            # Set
-            self.set_private_value(device, value)
-            self.set_private_stamp(device, stamp)
-            self.set_private_quality(device, quality)
+            # Swap the record
+            self.get_slots(device)[self] = _stamped(value, stamp, quality)
             # Push event
             if not disable_event and self.event_enabled(device):
-                self.push_event(device, *self.get_value(device))
+                self.push_event(device, value, stamp, quality)
+
+    @staticmethod
+    def changed(old_value, value):
+        """Test whether the value changed.
+
+        Arrays are compared by identity, since each acquisition produces
+        new arrays. This keeps the test in constant time and avoids
+        allocating a temporary boolean array. Two empty arrays, as
+        published for the disabled channels, are equal.
+        """
+        if getattr(value, "ndim", 0) or getattr(old_value, "ndim", 0):
+            if getattr(value, "size", None) == 0 and \
+               getattr(old_value, "size", None) == 0:
+                return False
+            return value is not old_value
+        return old_value != value
 
     # Aliases
 
@@ -480,6 +845,18 @@ class event_property(object):
     # Event method
 
     def push_event(self, device, value, stamp, quality):
+        limiter = getattr(device, "event_limiter", None)
+        period = self.get_event_period(device)
+        if limiter and period:
+            flush = functools.partial(self.push_current_event, device)
+            if not limiter.allow(self, self.event, period, flush):
+                return
+        self.fire_event(device, value, stamp, quality)
+
+    def push_current_event(self, device):
+        self.fire_event(device, *self.get_value(device))
+
+    def fire_event(self, device, value, stamp, quality):
         with self.get_lock(device):
             attr = getattr(device, self.get_attribute_name())
             if not attr.is_change_event():
@@ -487,6 +864,93 @@ class event_property(object):
             attr.set_value_date_quality(value, stamp, quality)
             attr.fire_change_event()
 
+    def get_event_period(self, device):
+        rate = getattr(device, self.rate) if self.rate else 0
+        return 1.0 / rate if rate > 0 else 0
+
+
+# Event rate limiter
+class EventRateLimiter(object):
+    """Limit the rate of change events and coalesce the extra ones.
+
+    An event arriving less than a period after the previous one is not
+    pushed. Instead, a flush function is registered and the `flush`
+    method calls it once the period has elapsed. The flush function
+    pushes the current value, so the last value is always delivered.
+    The number of suppressed events is counted per group.
+
+    Once started, a dedicated thread flushes the pending events when
+    they are due, independently of the thread producing the events.
+    """
+
+    def __init__(self):
+        """Initialize the limiter."""
+        self.lock = threading.Condition()
+        self.last = {}
+        self.pending = {}
+        self.suppressed = collections.defaultdict(int)
+        self.running = False
+        self.thread = None
+
+    def allow(self, key, group, period, flush):
+        """Return True if the event can be pushed right away."""
+        now = time.time()
+        with self.lock:
+            last = self.last.get(key)
+            if last is None or now - last >= period:
+                self.last[key] = now
+                self.pending.pop(key, None)
+                return True
+            if key in self.pending:
+                self.suppressed[group] += 1
+            self.pending[key] = period, flush
+            self.lock.notify()
+            return False
+
+    def next_flush(self):
+        """Return the delay before the next pending event is due, or None
+        (the lock must be held)."""
+        if not self.pending:
+            return None
+        due = min(self.last[key] + period
+                  for key, (period, _) in self.pending.items())
+        return max(due - time.time(), 0.0)
+
+    def flush(self):
+        """Push the pending events whose period has elapsed."""
+        now = time.time()
+        with self.lock:
+            due = [key for key, (period, _) in self.pending.items()
+                   if now - self.last[key] >= period]
+            flushes = [self.pending.pop(key)[1] for key in due]
+            self.last.update((key, now) for key in due)
+        for flush in flushes:
+            flush()
+
+    def start(self):
+        """Start the flushing thread."""
+        self.running = True
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the flushing thread."""
+        with self.lock:
+            self.running = False
+            self.lock.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def run(self):
+        """Flush the pending events when they are due, until stopped."""
+        while True:
+            with self.lock:
+                if not self.running:
+                    return
+                self.lock.wait(self.next_flush())
+            self.flush()
+
 
 # Mapping object
 class mapping(collections.MutableMapping):
@@ -543,18 +1007,30 @@ class RequestQueueDevice(PyTango.server.Device):
         PyTango.server.Device.set_state(self, PyTango.DevState.INIT)
         PyTango.server.Device.init_device(self)
         # State and attributes
+        self.event_limiter = EventRateLimiter()
+        self.event_limiter.start()
         self.update_attributes(reset=True)
         self.next_state = None
         # Request queue
-        self.request_queue = collections.deque()
+        self.init_request_queue()
         self.awake = LockEvent()
         self.alive = True
 
+    def init_request_queue(self):
+        """Initialize the request queue and the scheduler."""
+        self.request_queue = collections.deque()
+        self.queue_lock = threading.Lock()
+        self.pending_requests = {}
+        self.barrier_index = -1
+        self.queue_statistics = QueueStatistics()
+        self.scheduler = DeadlineScheduler()
+
     def delete_device(self):
         PyTango.server.Device.delete_device(self)
         """Try to stop the thread."""
         self.alive = False
         self.awake.set()
+        self.event_limiter.stop(1.0)
 
 # ------------------------------------------------------------------
 #    Exception method
@@ -582,10 +1058,9 @@ class RequestQueueDevice(PyTango.server.Device):
 
     def update_attributes(self, reset=False):
         """Reload attribute values."""
-        cls = type(self)
-        for name in dir(cls):
+        for prop in type(self).event_properties:
             try:
-                getattr(cls, name).reloader(self, reset)
+                prop.reloader(self, reset)
             except AttributeError:
                 pass
 
@@ -600,14 +1075,55 @@ class RequestQueueDevice(PyTango.server.Device):
                 self.awake.wait()
 
     def enqueue(self, func, *args, **kwargs):
-        """Enqueue a task to be process by the thread."""
-        item = func, args, kwargs
-        try:
-            append = (item != self.request_queue[-1])
-        except IndexError:
-            append = True
-        if append:
-            self.request_queue.append(item)
+        """Enqueue a task to be process by the thread.
+
+        The task is a barrier for the keyed tasks.
+        """
+        request = Request(func, args, kwargs)
+        with self.queue_lock:
+            try:
+                append = (request.task != self.request_queue[-1].task)
+            except IndexError:
+                append = True
+            if append:
+                self.request_queue.append(request)
+                self.barrier_index = request.index
+        self.scheduler.wakeup.set()
+
+    def enqueue_keyed(self, key, func, *args, **kwargs):
+        """Enqueue a task that replaces the pending task with the same key.
+
+        The pending task keeps its position in the queue, unless a
+        barrier has been enqueued since.
+        """
+        with self.queue_lock:
+            pending = self.pending_requests.get(key)
+            if pending is not None and pending.index > self.barrier_index:
+                pending.task = func, args, kwargs
+                self.queue_statistics.coalesced += 1
+                return
+            request = Request(func, args, kwargs, key)
+            self.request_queue.append(request)
+            self.pending_requests[key] = request
+        self.scheduler.wakeup.set()
+
+    def submit(self, func, *args, **kwargs):
+        """Enqueue a task and return a RequestFuture for its result.
+
+        The exceptions raised by the task are stored in the future
+        instead of being handled by the thread.
+        """
+        future = RequestFuture()
+
+        def wrapper():
+            if not future.start():
+                return
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as exc:
+                future.set_result(exception=exc)
+        self.enqueue(wrapper)
+        return future
 
     def enqueue_transition(self, state1, state2, func, *args, **kwargs):
         """Enqueue a task associated to a state transition."""
@@ -643,12 +1159,17 @@ class RequestQueueDevice(PyTango.server.Device):
         """Process all tasks in the queue."""
         while self.request_queue:
             # Get item
-            try:
-                item = self.request_queue[0]
-            except IndexError:
-                break
-            # Unpack item
-            func, args, kwargs = item
+            with self.queue_lock:
+                try:
+                    request = self.request_queue[0]
+                except IndexError:
+                    break
+                # The request cannot be replaced once started
+                if self.pending_requests.get(request.key) is request:
+                    del self.pending_requests[request.key]
+                # Unpack item
+                func, args, kwargs = request.task
+            self.queue_statistics.add(time.time() - request.stamp)
             # Process item
             try:
                 func(*args, **kwargs)
@@ -0,0 +1,173 @@
+"""Provide a process pool to decode the waveforms in parallel."""
+
+# Imports
+import os
+import glob
+import errno
+import numpy
+import tempfile
+import itertools
+import threading
+import multiprocessing
+from Queue import Queue
+
+# Directory used to hand the arrays over
+SHARED_MEMORY = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Prefix of the exported files, followed by the pid of the pool owner
+EXPORT_PREFIX = "scopedevice-"
+
+# Scope instance and file prefix of the worker process
+worker_scope = None
+worker_prefix = EXPORT_PREFIX
+
+# Pool counter, to make the file prefixes unique
+pool_counter = itertools.count()
+
+
+# Shared memory helpers
+def export_array(array, directory=SHARED_MEMORY, prefix=EXPORT_PREFIX):
+    """Write an array to a shared memory file and return its path.
+
+    Empty arrays cannot be mapped, so they are returned as they are.
+    """
+    array = numpy.asarray(array)
+    if not array.size:
+        return array
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".npy",
+                                dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        numpy.save(f, array)
+    return path
+
+
+def import_array(item):
+    """Map an array exported by export_array and release its file."""
+    if not isinstance(item, basestring):
+        return item
+    try:
+        return numpy.load(item, mmap_mode="r")
+    finally:
+        os.remove(item)
+
+
+def remove_exported(prefix, directory=SHARED_MEMORY):
+    """Remove the exported files with the given prefix."""
+    pattern = os.path.join(directory or tempfile.gettempdir(),
+                           prefix + "*.npy")
+    for path in glob.glob(pattern):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def remove_stale_exports(directory=SHARED_MEMORY):
+    """Remove the exported files left by the processes that died."""
+    pattern = os.path.join(directory or tempfile.gettempdir(),
+                           EXPORT_PREFIX + "*-*.npy")
+    pids = set()
+    for path in glob.glob(pattern):
+        pid = os.path.basename(path)[len(EXPORT_PREFIX):].split("-")[0]
+        if pid.isdigit():
+            pids.add(int(pid))
+    for pid in pids:
+        if not process_exists(pid):
+            prefix = "{0}{1}-".format(EXPORT_PREFIX, pid)
+            remove_exported(prefix, directory)
+
+
+def process_exists(pid):
+    """Return True if a process with the given pid exists."""
+    try:
+        os.kill(pid, 0)
+    except OSError as exc:
+        return exc.errno != errno.ESRCH
+    return True
+
+
+# Worker functions
+def initialize_worker(connection_class, host, prefix=EXPORT_PREFIX):
+    """Instanciate an unconnected scope used for parsing only."""
+    global worker_scope, worker_prefix
+    worker_scope = connection_class(host)
+    worker_prefix = prefix
+
+
+def decode_acquisition(channel_enabled, string):
+    """Parse an acquisition and export the waveforms to shared memory.
+
+    The files already exported are removed if an export fails.
+    """
+    data = worker_scope.parse_waveform_string(channel_enabled, string)
+    exported = {}
+    try:
+        for channel, waveform in data.items():
+            exported[channel] = export_array(
+                waveform, prefix=worker_prefix)
+    except Exception:
+        for item in exported.values():
+            if isinstance(item, basestring):
+                os.remove(item)
+        raise
+    return exported
+
+
+# Decoding pool
+class DecodingPool(object):
+    """Process pool decoding the acquisitions in parallel.
+
+    The waveforms are handed back through shared memory files instead of
+    being pickled, and the results are returned in submission order.
+    The number of acquisitions being decoded is limited to twice the
+    number of processes, so the decoding queue keeps applying its policy.
+
+    The files are named after the pool, so the ones left by the
+    interrupted or failed decodings are removed on close. The files
+    left by the dead device processes are removed on start.
+    """
+
+    def __init__(self, processes, connection_class, host):
+        """Start the worker processes."""
+        self.limit = threading.BoundedSemaphore(2 * processes)
+        self.pending = Queue()
+        self.prefix = "{0}{1}-{2}-".format(
+            EXPORT_PREFIX, os.getpid(), next(pool_counter))
+        remove_stale_exports()
+        self.pool = multiprocessing.Pool(
+            processes, initialize_worker,
+            (connection_class, host, self.prefix))
+
+    def submit(self, stamp, channel_enabled, string):
+        """Submit an acquisition, waiting if too many are being decoded."""
+        self.limit.acquire()
+        args = dict(channel_enabled), string
+        result = self.pool.apply_async(decode_acquisition, args)
+        self.pending.put((stamp, result))
+
+    def get(self):
+        """Return the oldest acquisition as a (stamp, data) tuple.
+
+        Return None if the pool has been interrupted.
+        """
+        item = self.pending.get()
+        if item is None:
+            return None
+        stamp, result = item
+        try:
+            exported = result.get()
+        finally:
+            self.limit.release()
+        data = dict((channel, import_array(waveform))
+                    for channel, waveform in exported.items())
+        return stamp, data
+
+    def interrupt(self):
+        """Make the next get call return None."""
+        self.pending.put(None)
+
+    def close(self):
+        """Terminate the worker processes and remove their files."""
+        self.pool.terminate()
+        self.pool.join()
+        remove_exported(self.prefix)
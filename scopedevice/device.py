@@ -4,7 +4,8 @@
 import numpy
 import socket
 import operator
-from Queue import Queue
+from Queue import Full
+from time import sleep
 from threading import Thread
 from timeit import default_timer as time
 
@@ -14,15 +15,32 @@ from PyTango import DevState
 from PyTango.server import device_property, command
 debug_it = PyTango.DebugIt(True, True, True)
 
+# Pipes are available from PyTango 9
+try:
+    from PyTango.server import pipe
+except ImportError:
+    pipe = None
+
 # Library imports
 from rohdescope import Vxi11Exception
 
 # Common imports
 from scopedevice.common import (read_attribute, rw_attribute, mapping,
                                 DeviceMeta, StopIO, partial, stamped,
-                                tick_context, safe_loop, safe_traceback,
+                                safe_loop, safe_traceback,
                                 debug_periodic_method, event_property,
-                                RequestQueueDevice)
+                                AcquisitionQueue, RequestQueueDevice,
+                                join_commands, split_reply, scpi_int,
+                                scpi_bool, RequestTimeout, Preempted)
+from scopedevice.decoding import DecodingPool
+from scopedevice.encoding import encode_waveform, check_compression
+from scopedevice.history import AcquisitionHistory
+from scopedevice.recorder import Recorder, resolve_path
+from scopedevice.waveform import (probe_conversion, convert_waveform,
+                                  binary_conversion, parse_binary_blocks,
+                                  LinspaceCache, envelope, envelope_edges,
+                                  statistics, waveform_statistics,
+                                  Accumulator, split_segments)
 
 
 # Generic scope device
@@ -35,21 +53,81 @@ class ScopeDevice(RequestQueueDevice):
     time_base_name = "TimeBase"
     waveform_names = dict((i, "Waveform" + str(i)) for i in channels)
     raw_waveform_names = dict((i, "RawWaveform" + str(i)) for i in channels)
+    display_waveform_names = dict(
+        (i, "DisplayWaveform" + str(i)) for i in channels)
+    segment_waveform_names = dict(
+        (i, "SegmentWaveform" + str(i)) for i in channels)
+
+    # Attributes declared with the WaveformDtype
+    # The time bases are always float64, since float32 cannot resolve
+    # more than about 2**24 points over the time range
+    waveform_dtypes = {"float64": PyTango.DevDouble,
+                       "float32": PyTango.DevFloat}
+    dtype_attribute_names = (
+        sorted(waveform_names.values()) +
+        sorted(display_waveform_names.values()) +
+        sorted(segment_waveform_names.values()))
+
+    # Raw waveform types of the unsigned binary formats
+    # Sample dtype -> Tango type, the signed samples are declared as DevShort
+    raw_waveform_types = {"u1": PyTango.DevUChar, "<u2": PyTango.DevUShort}
 
     # Library
     connection_class = None
 
+    # Acquisition control
+    # The binary acquisitions are armed by the device and polled if the
+    # scope class defines an arm command, and run by a blocking command
+    # otherwise. The string acquisitions are always run by the library.
+    acquisition_arm_command = None
+    acquisition_complete_query = "*ESR?"  # Bit 0 is set on completion
+    binary_acquisition_command = "RUNSingle;*OPC?"
+
+    # Binary transfer formats
+    # Format name -> (SCPI format, dtype, zero code, codes per division)
+    binary_formats = {}
+    binary_data_query = "CHANnel{0}:DATA?"
+
+    # Segmented acquisition
+    # {0} is replaced by the segment count in the setup command,
+    # and by the channel in the stamps query
+    segmented_setup_command = "ACQuire:SEGMented:STATe ON;:ACQuire:COUNt {0}"
+    segmented_reset_command = "ACQuire:SEGMented:STATe OFF"
+    segment_stamps_query = "CHANnel{0}:HISTory:TSRAll?"
+
+    # Settings groups
+    horizontal_settings = ("time_range", "time_position", "record_length")
+    trigger_settings = ("trigger_source", "trigger_slope", "trigger_coupling")
+    vertical_settings = ("channel_position", "channel_scale",
+                         "channel_coupling")
+
+    # Settings queries for batched polling
+    # Setting name -> (SCPI query, parser), {0} is replaced by the channel
+    settings_queries = {
+        "time_range": ("TIMebase:RANGe?", float),
+        "record_length": ("ACQuire:POINts?", scpi_int),
+        "channel_position": ("CHANnel{0}:POSition?", float),
+        "channel_scale": ("CHANnel{0}:SCALe?", float),
+        "channel_enabled": ("CHANnel{0}:STATe?", scpi_bool),
+    }
+
     # Settings
     update_timeout = 2.0        # Up-to-date limit for the device (informative)
     callback_timeout = 0.5      # Communication timeout set in the scope
     connection_timeout = 2.0    # Communication timeout set in the socket
     instrument_timeout = 2.0    # Communication timeout set in the library
+    execute_timeout = 5.0       # Limit the wait for a custom command
     update_period = 0.25        # Limit the loop frequency when updating
     acquisition_period = 0.005  # Limit loop frequency when acquiring
+    housekeeping_period = 1.0   # Period of the time base cache release
+    time_base_lifetime = 10.0   # Release unused time base arrays
 
     # Event properties
-    settings_property = partial(event_property, event="SettingsEvents")
-    waveform_property = partial(event_property, event="WaveformEvents")
+    settings_property = partial(event_property, event="SettingsEvents",
+                                rate="SettingsEventRate")
+    waveform_property = partial(event_property, event="WaveformEvents",
+                                rate="WaveformEventRate")
+    statistics_property = partial(event_property, event="StatisticsEvents")
 
 # ------------------------------------------------------------------
 #    Thread methods
@@ -68,35 +146,25 @@ class ScopeDevice(RequestQueueDevice):
                 self.disconnect()
             # Break the loop
             return True
-        # Get state
-        state = self.get_state()
-        updating = (state == DevState.ON)
-        acquiring = (state == DevState.RUNNING)
-        # Set period
-        period = 0
-        if acquiring:
-            period = self.acquisition_period
-        elif updating:
-            period = self.update_period
-        # Control loop time
-        with tick_context(period):
-            # Update and acquisitions
-            try:
-                # Update values
-                if self.connected and updating:
-                    self.update_all()
-                # Acquire waveforms
-                if self.connected and acquiring:
-                    self.acquire_waveforms()
-            # Handle exceptions
-            except Exception as exc:
-                self.handle_exception(exc)
-            # Process queue
-            try:
-                self.process_queue()
-            # Handle exceptions
-            except Exception as exc:
-                self.handle_exception(exc)
+        # Run the due tasks
+        self.scheduler.run_pending(self.handle_exception)
+        # Wait for the next deadline or a request
+        self.scheduler.wait()
+
+    def add_scheduled_tasks(self):
+        """Register the tasks of the scope thread, by priority."""
+        add = self.scheduler.add
+        add("queue", self.process_queue, 0, 0,
+            lambda: bool(self.request_queue))
+        add("acquisition", self.acquire_waveforms, self.acquisition_period, 1,
+            lambda: self.connected and self.get_state() == DevState.RUNNING)
+        add("update", self.update_all, self.update_period, 2,
+            lambda: self.connected and self.get_state() == DevState.ON)
+        add("housekeeping", self.housekeeping, self.housekeeping_period, 3)
+
+    def housekeeping(self):
+        """Release the unused time base arrays."""
+        self.time_base_cache.release()
 
     @safe_loop("register_exception")
     def decoding_loop(self):
@@ -104,39 +172,169 @@ class ScopeDevice(RequestQueueDevice):
         item = self.decoding_queue.get(True)
         # Check item
         if item is None:
+            if self.decoding_pool:
+                self.decoding_pool.interrupt()
             return True
-        stamp, string = item
-        # Decode waveforms
-        args = self.channel_enabled, string
+        stamp, payload = item
+        # Parse binary blocks
+        if self.binary_format:
+            blocks, reply = payload, None
+            if self.segment_count:
+                blocks, reply = payload
+            try:
+                data = parse_binary_blocks(blocks, self.binary_format[1])
+            except ValueError as exc:
+                self.warn_stream("Dropping an acquisition: {0}".format(exc))
+                return
+            if self.segment_count:
+                self.update_segments(data, reply, stamp=stamp)
+            else:
+                self.update_acquisition(data, stamp=stamp)
+            return
+        # Decode waveform strings in the process pool
+        if self.decoding_pool:
+            self.decoding_pool.submit(stamp, self.channel_enabled, payload)
+            return
+        # Decode waveform strings
+        args = self.channel_enabled, payload
         data = self.scope.parse_waveform_string(*args)
-        self.update_waveforms_from_data(data, stamp=stamp)
-        self.update_time_base(stamp=stamp)
+        self.update_acquisition(data, stamp=stamp)
+
+    @safe_loop("register_exception")
+    def publishing_loop(self):
+        """The target for the thread to publish the pool results."""
+        item = self.decoding_pool.get()
+        # Check item
+        if item is None:
+            return True
+        stamp, data = item
+        # Publish waveforms
+        self.update_acquisition(data, stamp=stamp)
 
     @debug_periodic_method("debug_stream")
     def update_all(self):
-        """Update all values."""
-        self.update_scope_status()
-        self.update_single_settings()
-        for channel in self.channels:
-            self.update_channel_settings(channel)
-
-    def update_single_settings(self):
-        """Update all the non-channel related settings."""
-        self.update_time_range()
-        self.update_time_position()
-        self.update_record_length()
-        self.update_trigger_source()
-        self.update_trigger_slope()
-        self.update_trigger_coupling()
-        self.update_trigger_level(5)
-
-    def update_channel_settings(self, channel):
-        """Update the setting for a given channel."""
-        self.update_channel_position(channel)
-        self.update_channel_scale(channel)
-        self.update_channel_coupling(channel)
-        self.update_trigger_level(channel)
-        self.update_channel_enabled(channel)
+        """Update the values of the settings groups that are due.
+
+        The vertical settings of the disabled channels are not polled,
+        only their enabled flag is. In event-driven mode, the settings
+        are polled when the instrument reports an event, periodically
+        for LocalPollDuration after that, and when the safety-net
+        period has elapsed.
+        """
+        now = time()
+        settings = []
+        # Status
+        if self.polling_due("status", self.StatusPeriod, now):
+            self.update_scope_status()
+        # Event-driven refresh
+        if self.EventDrivenPolling:
+            changed = self.read_event_status()
+            if changed:
+                self.event_stamp = now
+            period = self.SafetyPollPeriod
+            if self.polling_due("safety", period, now) or changed:
+                for group in ("horizontal", "trigger", "vertical"):
+                    self.polling_stamps.pop(group, None)
+        # Horizontal settings
+        period = self.get_polling_period(self.HorizontalPeriod, now)
+        if self.polling_due("horizontal", period, now):
+            settings.extend((name, None) for name in self.horizontal_settings)
+        # Trigger settings
+        period = self.get_polling_period(self.TriggerPeriod, now)
+        if self.polling_due("trigger", period, now):
+            settings.extend((name, None) for name in self.trigger_settings)
+            for channel in list(self.channels) + [5]:
+                settings.append(("trigger_level", channel))
+        # Vertical settings
+        period = self.get_polling_period(self.VerticalPeriod, now)
+        if self.polling_due("vertical", period, now):
+            for channel in self.channels:
+                settings.append(("channel_enabled", channel))
+                if self.channel_enabled[channel]:
+                    settings.extend((name, channel)
+                                    for name in self.vertical_settings)
+        # Update, the flags are only reset once the settings are refreshed
+        if settings:
+            self.update_settings(settings)
+            self.reset_flags()
+
+    def get_polling_period(self, period, now):
+        """Return the polling period of a settings group.
+
+        In event-driven mode, the groups are only polled on refresh,
+        except for LocalPollDuration after an event. The status register
+        has no bit for the setting changes: the default mask selects the
+        user request, reported when the LOCAL key is pressed, and the
+        front panel edits are then polled for a while.
+        """
+        if not self.EventDrivenPolling:
+            return period
+        if now - self.event_stamp < self.LocalPollDuration:
+            return period
+        return float("inf")
+
+    def read_event_status(self):
+        """Read and clear the standard event status register.
+
+        Return True if one of the bits of EventStatusMask is set.
+        """
+        status = scpi_int(self.scope.issue_command("*ESR?"))
+        return bool(status & self.EventStatusMask)
+
+    def polling_due(self, group, period, now):
+        """Check whether a settings group is due, and register the poll.
+
+        A tolerance of half an update period absorbs the jitter of the
+        update loop, so a group is not delayed by a whole update period.
+        """
+        tolerance = self.update_period / 2
+        if now - self.polling_stamps.get(group, -period) < period - tolerance:
+            return False
+        self.polling_stamps[group] = now
+        return True
+
+    def update_settings(self, settings):
+        """Update the given (name, channel) settings.
+
+        The settings with a known SCPI query are polled using a single
+        message. The other ones are polled one by one. If the reply to
+        the batched queries cannot be parsed, the batched polling is
+        disabled until the next Init. The communication errors are
+        handled as for any other poll.
+        """
+        batch = []
+        if self.batched_polling:
+            batch = [setting for setting in settings
+                     if setting[0] in self.settings_queries]
+        if batch:
+            try:
+                self.update_settings_batch(batch)
+            except ValueError as exc:
+                self.warn_stream("Batched polling failed: {0}".format(exc))
+                self.warn_stream("Falling back to per-query polling")
+                self.debug_stream(safe_traceback())
+                self.batched_polling = False
+                batch = []
+        for name, channel in settings:
+            if (name, channel) in batch:
+                continue
+            args = () if channel is None else (channel,)
+            getattr(self, "update_" + name)(*args)
+
+    def update_settings_batch(self, settings):
+        """Update the given (name, channel) settings in one round-trip."""
+        queries, parsers = zip(*(self.settings_queries[name]
+                                 for name, _ in settings))
+        queries = [query.format(channel)
+                   for query, (_, channel) in zip(queries, settings)]
+        reply = self.scope.issue_command(join_commands(queries))
+        replies = split_reply(reply, len(queries))
+        values = [parse(value) for parse, value in zip(parsers, replies)]
+        for (name, channel), value in zip(settings, values):
+            if channel is not None:
+                name += "_" + str(channel)
+            setattr(self, name, value)
+        self.update_time_base()
 
     def update_waveforms(self):
         """Update the waveforms. Currently not used."""
@@ -144,19 +342,237 @@ class ScopeDevice(RequestQueueDevice):
         self.update_waveforms_from_data(data)
         self.update_time_base()
 
+    def update_acquisition(self, data, stamp=None):
+        """Update the waveforms and time base for a decoded acquisition."""
+        self.update_waveforms_from_data(data, stamp=stamp)
+        self.update_history(data, stamp=stamp)
+        self.update_encoded_waveforms(data, stamp=stamp)
+        self.update_recording(data, stamp=stamp)
+        self.update_statistics(stamp=stamp)
+        self.update_time_base(stamp=stamp)
+        self.update_display_waveforms(stamp=stamp)
+        self.update_acquisition_pipe(stamp=stamp)
+
+    def update_segments(self, data, reply, stamp=None):
+        """Update the segment images and stamps of a segmented acquisition.
+
+        The samples are split into segments without copying, and the last
+        segment is published as a regular acquisition. The acquisition is
+        dropped if the samples do not match the record length.
+        """
+        count = self.segment_count
+        try:
+            segments = dict(
+                (channel, split_segments(raw, count, self.record_length))
+                for channel, raw in data.items())
+        except ValueError as exc:
+            msg = "Dropping a segmented acquisition: {0}"
+            self.warn_stream(msg.format(exc))
+            return
+        factors = self.get_conversion_factors(segments)
+        for channel in self.channels:
+            raw = segments.get(channel, numpy.zeros((0, 0)))
+            gain, offset = factors.get(channel, (1.0, 0.0))
+            image = convert_waveform(raw, gain, offset, self.waveform_dtype)
+            self.segment_waveforms[channel] = stamped(image, stamp)
+        self.segment_stamps = stamped(
+            self.get_segment_stamps(reply, stamp), stamp)
+        last = dict((channel, raw[-1]) for channel, raw in segments.items()
+                    if len(raw))
+        self.update_acquisition(last, stamp=stamp)
+
+    def get_segment_stamps(self, reply, stamp):
+        """Return the absolute stamps of the segments.
+
+        The scope reports the stamps relative to the last segment,
+        which is assumed to be stamped at the end of the acquisition.
+        """
+        count = self.segment_count
+        stamp = time() if stamp is None else stamp
+        try:
+            relative = [float(value) for value in str(reply).split(",")]
+        except ValueError:
+            relative = []
+        if len(relative) < count:
+            msg = "Unexpected segment stamps: {0!r}"
+            self.warn_stream(msg.format(str(reply)[:64]))
+            return numpy.repeat(stamp, count)
+        relative = numpy.array(relative[-count:])
+        return stamp + relative - relative[-1]
+
     def update_waveforms_from_data(self, data, stamp=None):
-        """Update the waveforms with the given raw data."""
-        args = data, self.channel_scales, self.channel_positions
-        waveforms = self.scope.convert_waveforms(*args)
-        raw_waveforms = self.scope.convert_waveforms(data)
+        """Update the waveforms with the given raw data.
+
+        The raw samples are kept in their native dtype and the waveforms
+        are computed from them in a single pass.
+        """
+        factors = self.conversion_factors = self.get_conversion_factors(data)
         for channel in self.channels:
-            waveform = waveforms.get(channel, [])
-            raw_waveform = raw_waveforms.get(channel, [])
+            raw_waveform = numpy.asarray(data.get(channel, []))
+            gain, offset = factors.get(channel, (1.0, 0.0))
+            waveform = convert_waveform(
+                raw_waveform, gain, offset, self.waveform_dtype)
+            waveform = self.accumulate(
+                channel, raw_waveform, waveform, gain, offset)
             self.waveforms[channel] = stamped(waveform, stamp)
             self.raw_waveforms[channel] = stamped(raw_waveform, stamp)
 
+    def accumulate(self, channel, raw_waveform, waveform, gain, offset):
+        """Accumulate the waveform of a channel.
+
+        The accumulation is disabled if its state cannot be allocated.
+        """
+        try:
+            return self.accumulators[channel].apply(
+                raw_waveform, waveform, gain, offset,
+                self.accumulation_mode, self.accumulation_count)
+        except MemoryError:
+            msg = "Not enough memory to accumulate channel {0}, "
+            msg += "the accumulation is disabled"
+            self.error_stream(msg.format(channel))
+            self.accumulation_mode = Accumulator.NONE
+            self.reset_accumulation()
+            return waveform
+
+    def update_acquisition_pipe(self, stamp=None):
+        """Gather the acquisition in a single blob and push it.
+
+        The blob is built from the values of the current acquisition,
+        so the clients never get a mix of different acquisitions.
+        """
+        stamp = time() if stamp is None else stamp
+        channels = [channel for channel in self.channels
+                    if self.waveforms[channel] is not None and
+                    len(self.waveforms[channel])]
+        start, stop, length = self.linspace_args
+        step = (stop - start) / (length - 1) if length > 1 else 0.0
+        factors = [self.conversion_factors.get(channel, (1.0, 0.0))
+                   for channel in channels]
+        gains = [gain for gain, _ in factors]
+        offsets = [offset for _, offset in factors]
+        blob = [
+            {"name": "stamp", "value": stamp},
+            {"name": "sequence", "value": self.acquisition_sequence},
+            {"name": "channels", "value": numpy.array(channels, "int32")},
+            {"name": "gains", "value": numpy.array(gains, "float64")},
+            {"name": "offsets", "value": numpy.array(offsets, "float64")},
+            {"name": "time_base_start", "value": start},
+            {"name": "time_base_step", "value": step},
+            {"name": "time_base_length", "value": length},
+        ]
+        blob.extend({"name": "waveform{0}".format(channel),
+                     "value": self.waveforms[channel]}
+                    for channel in channels)
+        self.acquisition_blob = "acquisition", blob
+        if pipe is None or not self.WaveformEvents:
+            return
+        try:
+            self.push_pipe_event("Acquisition", self.acquisition_blob)
+        except PyTango.DevFailed:
+            self.debug_stream(safe_traceback())
+
+    def update_history(self, data, stamp=None):
+        """Number the acquisition and store it in the history."""
+        self.acquisition_sequence += 1
+        if self.history is not None:
+            stamp = time() if stamp is None else stamp
+            self.history.store(self.acquisition_sequence, stamp, data,
+                               self.conversion_factors)
+
+    def update_encoded_waveforms(self, data, stamp=None):
+        """Encode the raw samples once for all the readers."""
+        for channel in self.channels:
+            raw_waveform = numpy.asarray(data.get(channel, []))
+            encoded = self.empty_encoding
+            if len(raw_waveform):
+                gain, offset = self.conversion_factors[channel]
+                encoded = encode_waveform(
+                    raw_waveform, gain, offset,
+                    self.EncodedCompression, self.EncodedCompressionLevel,
+                    channel=channel, sequence=self.acquisition_sequence)
+            self.encoded_waveforms[channel] = stamped(encoded, stamp)
+
+    def update_recording(self, data, stamp=None):
+        """Feed the acquisition to the recorder, if recording."""
+        if self.recorder is not None and self.recorder.active:
+            stamp = time() if stamp is None else stamp
+            self.recorder.put(self.acquisition_sequence, stamp, data,
+                              self.conversion_factors)
+
+    def get_settings_snapshot(self):
+        """Return the current scope settings as a serializable dict."""
+        settings = dict((name, getattr(self, name)) for name in
+                        self.horizontal_settings + self.trigger_settings)
+        for name in self.vertical_settings + ("channel_enabled",):
+            settings[name] = dict(self.channel_mapping(name))
+        settings["trigger_level"] = dict(self.trigger_levels)
+        settings["host"] = self.Host
+        settings["transfer_format"] = self.TransferFormat
+        return settings
+
+    def update_statistics(self, stamp=None):
+        """Compute the statistics of each channel from the raw samples."""
+        for channel in self.channels:
+            raw_waveform = self.raw_waveforms[channel]
+            result = statistics(*[None] * len(statistics._fields))
+            if raw_waveform is not None and len(raw_waveform):
+                factors = self.conversion_factors.get(channel, (1.0, 0.0))
+                result = waveform_statistics(raw_waveform, *factors)
+            for name, value in zip(result._fields, result):
+                mapping = self.statistics_mappings[name]
+                mapping[channel] = stamped(value, stamp)
+
+    def update_display_waveforms(self, stamp=None):
+        """Compute the decimated waveforms and time base for display.
+
+        Each waveform is reduced to a min/max envelope of DisplayLength
+        points at most.
+        """
+        buckets = self.DisplayLength // 2
+        if buckets <= 0:
+            return
+        start, stop, length = self.linspace_args
+        # Get bucket edges
+        edges = None
+        if length > 2 * buckets:
+            edges = envelope_edges(length, buckets)
+        # Update time base
+        args = start, stop, length, buckets
+        if self.display_args != args:
+            self.display_args = args
+            step = (stop - start) / (length - 1) if length > 1 else 0.0
+            if edges is None:
+                times = numpy.arange(length)
+            else:
+                times = numpy.repeat(edges, 2)
+            times = start + step * times
+            self.display_time_base = stamped(times, stamp)
+        # Update waveforms
+        for channel in self.channels:
+            waveform = self.waveforms[channel]
+            if edges is not None and waveform is not None and len(waveform):
+                waveform = envelope(waveform, edges)
+            self.display_waveforms[channel] = stamped(waveform, stamp)
+
+    def get_conversion_factors(self, data):
+        """Return the (gain, offset) conversion factors for each channel."""
+        if not self.binary_format:
+            args = self.channel_scales, self.channel_positions
+            return probe_conversion(self.scope.convert_waveforms, data, *args)
+        _, _, zero, per_div = self.binary_format
+        return dict(
+            (channel, binary_conversion(zero, per_div,
+                                        self.channel_scales[channel],
+                                        self.channel_positions[channel]))
+            for channel in data)
+
     def update_time_base(self, stamp=None):
-        """Compute a new time base if necessary."""
+        """Update the time base parameters if necessary.
+
+        The time base array itself is only computed when it is read,
+        or when it has to be pushed to the subscribers of its change
+        events.
+        """
         # Get length
         gen = (len(data) for data in self.waveforms.values()
                if data is not None and len(data))
@@ -165,22 +581,113 @@ class ScopeDevice(RequestQueueDevice):
         mean = self.time_position if self.time_position else 0.0
         half = self.time_range / 2 if self.time_range else 0.0
         start, stop = (op(mean, half) for op in (operator.sub, operator.add))
-        # Update value
+        # Check args
         args = (start, stop, length)
-        if self.linspace_args != args:
-            self.time_base = stamped(numpy.linspace(*args), stamp)
+        if self.linspace_args == args:
+            return
+        # Update parameters
+        step = (stop - start) / (length - 1) if length > 1 else 0.0
+        self.time_base_start = stamped(start, stamp)
+        self.time_base_step = stamped(step, stamp)
+        self.time_base_length = stamped(length, stamp)
+        self.time_base_stamp = stamp if stamp else time()
         # Update args attribute
         self.linspace_args = args
+        # Push time base event
+        if self.WaveformEvents:
+            self.push_time_base()
+
+    def push_time_base(self):
+        """Push the time base array to the subscribers, if any.
+
+        The array is not kept with the event, so it is released along
+        with the cache entry. PyTango versions that do not report the
+        subscriptions always get the event.
+        """
+        multi_attribute = self.get_device_attr()
+        attr = multi_attribute.get_attr_by_name(self.time_base_name)
+        subscribed = getattr(attr, "change_event_subscribed", None)
+        if subscribed is not None and not subscribed():
+            return
+        value = self.time_base_cache.get(self.linspace_args)
+        quality = PyTango.AttrQuality.ATTR_VALID
+        attr.set_value_date_quality(value, self.time_base_stamp, quality)
+        attr.fire_change_event()
 
     @debug_periodic_method("debug_stream")
     def acquire_waveforms(self):
         """Run a single acquisition and stamp it."""
         channel_enabled = dict(self.channel_enabled)
         self.info_stream("Running a new waveform acquisition...")
-        item = self.scope.stamp_acquisition(channel_enabled)
+        if self.binary_format and self.segment_count:
+            item = self.stamp_segmented_acquisition(channel_enabled)
+        elif self.binary_format:
+            item = self.stamp_binary_acquisition(channel_enabled)
+        else:
+            item = self.scope.stamp_acquisition(channel_enabled)
         self.info_stream("The waveform acquisition completed successfully!")
         self.reset_flags()
-        self.decoding_queue.put(item)
+        self.queue_acquisition(item)
+
+    def queue_acquisition(self, item):
+        """Put an acquisition in the decoding queue.
+
+        With the block policy, the queue is polled every callback
+        timeout so the wait is interrupted when the thread stops.
+        """
+        while True:
+            try:
+                return self.decoding_queue.put(
+                    item, timeout=self.callback_timeout)
+            except Full:
+                self.scope_callback(None)
+
+    def stamp_binary_acquisition(self, channel_enabled):
+        """Run a single acquisition and fetch the binary blocks."""
+        if self.acquisition_arm_command:
+            self.wait_acquisition()
+        else:
+            self.scope.issue_command(self.binary_acquisition_command)
+        stamp = time()
+        blocks = dict(
+            (channel, self.scope.issue_command(
+                self.binary_data_query.format(channel)))
+            for channel, enabled in channel_enabled.items() if enabled)
+        return stamp, blocks
+
+    def wait_acquisition(self):
+        """Arm the acquisition and wait for its completion.
+
+        The operation complete bit is polled every TriggerPollPeriod,
+        and the wait is preempted by scope_callback if requests are
+        pending. The acquisition then stays armed, and the wait resumes
+        at the next call. The preemption is only allowed between the
+        queries, so a reply is never left unread on the connection.
+        """
+        if not self.armed:
+            self.scope.issue_command(self.acquisition_arm_command)
+            self.armed = True
+        query = self.acquisition_complete_query
+        while not scpi_int(self.scope.issue_command(query)) & 1:
+            self.preemptible = True
+            try:
+                self.scope_callback(None)
+                sleep(self.TriggerPollPeriod)
+            finally:
+                self.preemptible = False
+        self.armed = False
+
+    def stamp_segmented_acquisition(self, channel_enabled):
+        """Run a segmented acquisition and fetch the segments and stamps.
+
+        All the segments of a channel are fetched in a single block.
+        """
+        stamp, blocks = self.stamp_binary_acquisition(channel_enabled)
+        reply = ""
+        if blocks:
+            query = self.segment_stamps_query.format(min(blocks))
+            reply = self.scope.issue_command(query)
+        return stamp, (blocks, reply)
 
 # ------------------------------------------------------------------
 #    Scope methods
@@ -190,6 +697,7 @@ class ScopeDevice(RequestQueueDevice):
         """Connect to the instrument."""
         self.scope.connect()
         self.update_identifier()
+        self.polling_stamps.clear()
         self.reset_flags()
 
     def disconnect(self):
@@ -206,10 +714,25 @@ class ScopeDevice(RequestQueueDevice):
     def prepare_acquisition(self):
         """Prepare the waveform acquisition."""
         self.scope.configure()
+        if self.binary_format:
+            self.configure_binary_transfer()
+        self.armed = False
+        if self.segment_count:
+            command = self.segmented_setup_command
+            self.scope.issue_command(command.format(self.segment_count))
         self.reset_flags()
 
+    def configure_binary_transfer(self):
+        """Configure the scope for binary block transfers."""
+        scpi_format = self.binary_format[0]
+        self.scope.issue_command("FORMat:DATA {0}".format(scpi_format))
+        self.scope.issue_command("FORMat:BORDer LSBFirst")
+
     def clean_acquisition(self):
         """Clean the waveform acquisition."""
+        self.armed = False
+        if self.segment_count:
+            self.scope.issue_command(self.segmented_reset_command)
         self.scope.configure()
         self.reset_flags()
 
@@ -234,6 +757,10 @@ class ScopeDevice(RequestQueueDevice):
         if not self.alive and not self.disconnecting:
             msg = "Stopping the thread..."
             raise StopIO(msg)
+        # Service the pending requests
+        if self.preemptible and self.request_queue:
+            msg = "Trigger wait preempted by the pending requests"
+            raise Preempted(msg)
 
     def update_scope_status(self):
         """Update instrument status and time stamp"""
@@ -247,6 +774,10 @@ class ScopeDevice(RequestQueueDevice):
     @debug_it
     def handle_exception(self, exc):
         """Process an exception raised during the thread execution."""
+        # Ignore Preempted exception
+        if isinstance(exc, Preempted):
+            self.debug_stream(str(exc))
+            return
         # Ignore StopIO exception
         if isinstance(exc, StopIO):
             self.info_stream(str(exc))
@@ -271,6 +802,19 @@ class ScopeDevice(RequestQueueDevice):
         # Register exception
         self.register_exception(exc)
 
+    def enqueue_write(self, set_func, update_func, *args):
+        """Enqueue a setting write followed by the update of the setting.
+
+        The write replaces any pending write of the same setting, so only
+        the last value is sent to the instrument. The last argument is
+        the value, the others are passed to the update function.
+        """
+        def write():
+            set_func(*args)
+            update_func(*args[:-1])
+        key = (update_func.__name__,) + args[:-1]
+        self.enqueue_keyed(key, write)
+
     def channel_mapping(self, base, external=False):
         """Helper method to create a mapping interface."""
         channels = list(self.channels)
@@ -329,8 +873,20 @@ class ScopeDevice(RequestQueueDevice):
                 status = self.status if self.status else default_status
                 status += " Up-to-date."
             self.result = status
+        # Recording status
+        if self.get_state() in (DevState.ON, DevState.RUNNING):
+            self.result += self.get_recording_string()
         return self.result
 
+    def get_recording_string(self):
+        if self.recorder is None:
+            return ""
+        if self.recorder.error:
+            return "\nRecording failed: " + self.recorder.error
+        if self.recorder.active:
+            return "\nRecording to " + self.recording_path
+        return ""
+
     def get_update_string(self):
         delta = time() - self.stamp
         if delta < self.update_timeout:
@@ -349,16 +905,87 @@ class ScopeDevice(RequestQueueDevice):
         RequestQueueDevice.init_device(self)
         # Misc. attributes
         self.linspace_args = None
+        self.display_args = None
+        self.batched_polling = self.BatchedPolling
+        self.polling_stamps = {}
+        self.event_stamp = float("-inf")
+        self.time_base_stamp = time()
+        self.waveform_dtype = self.WaveformDtype
+        self.time_base_cache = LinspaceCache(self.time_base_lifetime)
+        if self.WaveformEvents:
+            self.set_change_event(self.time_base_name, True, False)
         self.disconnecting = False
+        self.armed = False
+        self.preemptible = False
         self.stamp = time()
         self.error = ""
         # Thread attribute
+        self.add_scheduled_tasks()
         self.scope_thread = Thread(target=self.scope_loop)
         self.decoding_thread = Thread(target=self.decoding_loop)
-        self.decoding_queue = Queue()
+        try:
+            self.decoding_queue = AcquisitionQueue(
+                self.DecodingQueueSize, self.DecodingQueuePolicy)
+        except ValueError as exc:
+            self.decoding_queue = AcquisitionQueue()
+            self.error = str(exc)
+        # Transfer format
+        self.binary_format = None
+        if self.TransferFormat in self.binary_formats:
+            self.binary_format = self.binary_formats[self.TransferFormat]
+        elif self.TransferFormat != "string":
+            msg = "Invalid transfer format: {0!r} (expected one of {1})"
+            formats = ", ".join(["string"] + sorted(self.binary_formats))
+            self.error = msg.format(self.TransferFormat, formats)
+        self.segment_count = max(self.SegmentCount, 0)
+        if self.segment_count == 1:
+            self.segment_count = 0
+        if self.segment_count and not self.binary_format:
+            self.error = "The segmented mode requires a binary TransferFormat"
+        # Waveform dtype
+        if self.waveform_dtype not in self.waveform_dtypes:
+            msg = "Invalid waveform dtype: {0!r} (expected one of {1})"
+            dtypes = ", ".join(sorted(self.waveform_dtypes))
+            self.error = msg.format(self.waveform_dtype, dtypes)
+        declared = getattr(self, "declared_attribute_types", None)
+        if declared is not None and declared != self.get_attribute_types():
+            self.error = "The WaveformDtype or TransferFormat property "
+            self.error += "changed, the device server has to be restarted."
+        try:
+            check_compression(self.EncodedCompression)
+        except ValueError as exc:
+            self.error = str(exc)
+        if not 0 <= self.DisplayLength <= 10**6:
+            msg = "Invalid display length: {0} (expected 0 to {1})"
+            self.error = msg.format(self.DisplayLength, 10**6)
+        self.decoding_pool = None
+        if self.DecodingProcesses > 0:
+            self.decoding_pool = DecodingPool(
+                self.DecodingProcesses, self.connection_class, self.Host)
+            self.publishing_thread = Thread(target=self.publishing_loop)
         # Mapping attributes
         self.waveforms = self.channel_mapping("waveform")
         self.raw_waveforms = self.channel_mapping("raw_waveform")
+        self.display_waveforms = self.channel_mapping("display_waveform")
+        self.segment_waveforms = self.channel_mapping("segment_waveform")
+        self.encoded_waveforms = self.channel_mapping("encoded_waveform")
+        self.conversion_factors = {}
+        self.accumulation_mode = Accumulator.NONE
+        self.accumulation_count = 10
+        self.accumulators = dict(
+            (channel, Accumulator(self.AccumulationMemory * 2**20))
+            for channel in self.channels)
+        self.acquisition_sequence = -1
+        self.acquisition_blob = "acquisition", []
+        self.history = None
+        if self.HistoryDepth > 0:
+            self.history = AcquisitionHistory(
+                self.HistoryDepth, self.channels, self.HistoryFile or None)
+        self.recorder = None
+        self.recording_path = ""
+        self.statistics_mappings = dict(
+            (name, self.channel_mapping("waveform_" + name))
+            for name in statistics._fields)
         self.channel_coupling = self.channel_mapping("channel_coupling")
         self.channel_positions = self.channel_mapping("channel_position")
         self.channel_scales = self.channel_mapping("channel_scale")
@@ -374,14 +1001,67 @@ class ScopeDevice(RequestQueueDevice):
         # Run thread
         self.scope_thread.start()
         self.decoding_thread.start()
+        if self.decoding_pool:
+            self.publishing_thread.start()
         # Check host name
         if not self.Host:
             self.error = "The Host name is not defined."
             self.set_state(DevState.FAULT)
             return
+        # Check the configuration properties
+        if self.error:
+            self.set_state(DevState.FAULT)
+            return
         # Set state
         self.set_state(PyTango.DevState.STANDBY)
 
+    def initialize_dynamic_attributes(self):
+        """Declare the attributes whose type depends on the properties."""
+        self.declared_attribute_types = self.get_attribute_types()
+        for name, dtype in sorted(self.declared_attribute_types.items()):
+            self.retype_attribute(name, dtype)
+
+    def get_attribute_types(self):
+        """Return the attributes to declare with another type.
+
+        The waveforms follow the WaveformDtype, and the raw waveforms
+        follow the sample type of the TransferFormat.
+        """
+        types = {}
+        dtype = self.waveform_dtypes.get(self.waveform_dtype)
+        if dtype is not None and self.waveform_dtype != "float64":
+            types.update((name, dtype) for name in self.dtype_attribute_names)
+        if self.binary_format:
+            dtype = self.raw_waveform_types.get(self.binary_format[1])
+            if dtype is not None:
+                types.update((name, dtype)
+                             for name in self.raw_waveform_names.values())
+        return types
+
+    def retype_attribute(self, name, dtype):
+        """Declare a read-only array attribute again with another type.
+
+        The attribute configuration stored in the database is kept.
+        """
+        multi_attribute = self.get_device_attr()
+        old = multi_attribute.get_attr_by_name(name)
+        config = old.get_properties()
+        events = old.is_change_event()
+        access = PyTango.AttrWriteType.READ
+        if old.get_data_format() == PyTango.AttrDataFormat.IMAGE:
+            new = PyTango.ImageAttr(name, dtype, access,
+                                    old.get_max_dim_x(), old.get_max_dim_y())
+        else:
+            new = PyTango.SpectrumAttr(name, dtype, access,
+                                       old.get_max_dim_x())
+        read = getattr(self, "read_" + name)
+        self.remove_attribute(name, clean_db=False)
+        self.add_attribute(new, read, None, self.is_read_allowed)
+        attr = multi_attribute.get_attr_by_name(name)
+        attr.set_properties(config)
+        if events:
+            attr.set_change_event(True, False)
+
     @debug_it
     def delete_device(self):
         """Try to stop the thread."""
@@ -390,6 +1070,7 @@ class ScopeDevice(RequestQueueDevice):
         RequestQueueDevice.delete_device(self)
         self.stop_scope_thread()
         self.stop_decoding_thread()
+        self.stop_recording()
         self.update_attributes(reset=True)
 
     def stop_scope_thread(self):
@@ -402,9 +1083,14 @@ class ScopeDevice(RequestQueueDevice):
 
     def stop_decoding_thread(self):
         """Stop the decoding thread."""
-        self.decoding_queue.put(None)
+        self.decoding_queue.interrupt()
         self.info_stream("Joining the decoding thread...")
         self.decoding_thread.join(self.callback_timeout)
+        if not self.decoding_pool:
+            return
+        self.info_stream("Joining the publishing thread...")
+        self.publishing_thread.join(self.callback_timeout)
+        self.decoding_pool.close()
 
 # ------------------------------------------------------------------
 #    General properties
@@ -427,6 +1113,205 @@ class ScopeDevice(RequestQueueDevice):
         doc="Enable TANGO change events for scope settings.",
         )
 
+    StatisticsEvents = device_property(
+        dtype=bool,
+        default_value=True,
+        doc="Enable TANGO change events for waveform statistics.",
+        )
+
+    WaveformEventRate = device_property(
+        dtype=float,
+        default_value=0.0,
+        doc="Maximum rate of change events per waveform attribute "
+        "(in Hz, 0 for no limit).",
+        )
+
+    SettingsEventRate = device_property(
+        dtype=float,
+        default_value=0.0,
+        doc="Maximum rate of change events per settings attribute "
+        "(in Hz, 0 for no limit).",
+        )
+
+    DecodingQueueSize = device_property(
+        dtype=int,
+        default_value=2,
+        doc="Maximum number of acquisitions waiting to be decoded "
+        "(0 for no limit).",
+        )
+
+    DecodingQueuePolicy = device_property(
+        dtype=str,
+        default_value="drop_oldest",
+        doc="Policy applied when the decoding queue is full: "
+        "block, drop_oldest or keep_latest.",
+        )
+
+    DecodingProcesses = device_property(
+        dtype=int,
+        default_value=0,
+        doc="Number of processes decoding the waveforms in parallel "
+        "(0 to decode in the device process).",
+        )
+
+    EncodedCompression = device_property(
+        dtype=str,
+        default_value="none",
+        doc="Compression of the encoded waveforms: "
+        "none, zlib or lz4 (if installed).",
+        )
+
+    EncodedCompressionLevel = device_property(
+        dtype=int,
+        default_value=1,
+        doc="Compression level of the encoded waveforms.",
+        )
+
+    SegmentCount = device_property(
+        dtype=int,
+        default_value=0,
+        doc="Number of triggers captured by each acquisition in segmented "
+        "mode (0 to disable it). Requires a binary TransferFormat.",
+        )
+
+    HistoryDepth = device_property(
+        dtype=int,
+        default_value=0,
+        doc="Number of acquisitions kept in the history "
+        "(0 to disable it).",
+        )
+
+    HistoryFile = device_property(
+        dtype=str,
+        default_value="",
+        doc="Path of the file mapping the history samples "
+        "(empty to keep them in memory).",
+        )
+
+    RecordingDirectory = device_property(
+        dtype=str,
+        default_value="",
+        doc="Directory of the recordings, the recording paths are "
+        "relative to it and cannot leave it (empty to disable the "
+        "recording).",
+        )
+
+    RecordingQueueSize = device_property(
+        dtype=int,
+        default_value=64,
+        doc="Number of acquisitions waiting to be written "
+        "before the oldest ones are dropped.",
+        )
+
+    RecordingChunkMemory = device_property(
+        dtype=int,
+        default_value=64,
+        doc="Size of the chunks written at once by the recorder "
+        "(in MB). A chunk holds at least one acquisition.",
+        )
+
+    AccumulationMemory = device_property(
+        dtype=int,
+        default_value=256,
+        doc="Memory of the running average of each channel (in MB). "
+        "The number of averaged acquisitions is capped accordingly.",
+        )
+
+    DisplayLength = device_property(
+        dtype=int,
+        default_value=2000,
+        doc="Maximum length of the display waveforms, up to 1000000 "
+        "(0 to disable them).",
+        )
+
+    BatchedPolling = device_property(
+        dtype=bool,
+        default_value=True,
+        doc="Poll the settings using a single SCPI message per cycle.",
+        )
+
+    StatusPeriod = device_property(
+        dtype=float,
+        default_value=1.0,
+        doc="Polling period for the instrument status (in seconds).",
+        )
+
+    HorizontalPeriod = device_property(
+        dtype=float,
+        default_value=0.5,
+        doc="Polling period for the time range, time position "
+        "and record length (in seconds).",
+        )
+
+    TriggerPeriod = device_property(
+        dtype=float,
+        default_value=0.5,
+        doc="Polling period for the trigger settings (in seconds).",
+        )
+
+    VerticalPeriod = device_property(
+        dtype=float,
+        default_value=0.25,
+        doc="Polling period for the channel settings (in seconds). "
+        "Only the enabled flag is polled for disabled channels.",
+        )
+
+    EventDrivenPolling = device_property(
+        dtype=bool,
+        default_value=False,
+        doc="Only poll the settings when the standard event status "
+        "register reports a change, or after SafetyPollPeriod.",
+        )
+
+    EventStatusMask = device_property(
+        dtype=int,
+        default_value=64,
+        doc="Bits of the standard event status register triggering "
+        "a settings refresh (64 for user request, i.e. the LOCAL key). "
+        "No bit reports the setting changes: the changes made without "
+        "an event are only seen after SafetyPollPeriod.",
+        )
+
+    LocalPollDuration = device_property(
+        dtype=float,
+        default_value=60.0,
+        doc="Duration of the periodic polling after an event in "
+        "event-driven mode, while the settings are edited on the "
+        "front panel (in seconds).",
+        )
+
+    TriggerPollPeriod = device_property(
+        dtype=float,
+        default_value=0.02,
+        doc="Period of the acquisition complete polling with a binary "
+        "TransferFormat, on the scopes whose acquisitions are armed by "
+        "the device (in seconds). The pending requests are serviced "
+        "within this period while waiting for a trigger.",
+        )
+
+    SafetyPollPeriod = device_property(
+        dtype=float,
+        default_value=10.0,
+        doc="Maximum interval between two settings refreshes "
+        "in event-driven mode (in seconds).",
+        )
+
+    WaveformDtype = device_property(
+        dtype=str,
+        default_value="float64",
+        doc="Type of the waveforms: float64 or float32. The time bases "
+        "are always float64. A change requires a restart of the device "
+        "server.",
+        )
+
+    TransferFormat = device_property(
+        dtype=str,
+        default_value="string",
+        doc="Waveform transfer format: string, or int8 and int16 "
+        "for binary block transfers. A change of the raw sample type "
+        "requires a restart of the device server.",
+        )
+
 # ------------------------------------------------------------------
 #    General attributes
 # ------------------------------------------------------------------
@@ -444,6 +1329,30 @@ class ScopeDevice(RequestQueueDevice):
     def update_identifier(self):
         self.identifier = self.scope.get_identifier()
 
+    # Suppressed events
+
+    SuppressedWaveformEvents = read_attribute(
+        dtype=int,
+        label="Suppressed waveform events",
+        format="%d",
+        doc="Number of waveform change events coalesced "
+        "because of the rate limit",
+    )
+
+    def read_SuppressedWaveformEvents(self):
+        return self.event_limiter.suppressed["WaveformEvents"]
+
+    SuppressedSettingsEvents = read_attribute(
+        dtype=int,
+        label="Suppressed settings events",
+        format="%d",
+        doc="Number of settings change events coalesced "
+        "because of the rate limit",
+    )
+
+    def read_SuppressedSettingsEvents(self):
+        return self.event_limiter.suppressed["SettingsEvents"]
+
     def is_read_allowed(self, request=None):
         return self.get_state() not in [DevState.INIT, DevState.FAULT]
 
@@ -475,8 +1384,9 @@ class ScopeDevice(RequestQueueDevice):
     )
 
     def write_TimeRange(self, time_range):
-        self.enqueue(self.scope.set_time_range, time_range)
-        self.enqueue(self.update_time_range)
+        self.enqueue_write(self.scope.set_time_range,
+                           self.update_time_range,
+                           time_range)
 
     def update_time_range(self):
         self.time_range = self.scope.get_time_range()
@@ -498,8 +1408,9 @@ class ScopeDevice(RequestQueueDevice):
     )
 
     def write_TimePosition(self, position):
-        self.enqueue(self.scope.set_time_position, position)
-        self.enqueue(self.update_time_position)
+        self.enqueue_write(self.scope.set_time_position,
+                           self.update_time_position,
+                           position)
 
     def update_time_position(self):
         self.time_position = self.scope.get_time_position()
@@ -521,25 +1432,63 @@ class ScopeDevice(RequestQueueDevice):
     )
 
     def write_RecordLength(self, length):
-        self.enqueue(self.scope.set_record_length, length)
-        self.enqueue(self.update_record_length)
+        self.enqueue_write(self.scope.set_record_length,
+                           self.update_record_length,
+                           length)
 
     def update_record_length(self):
         self.record_length = self.scope.get_record_length()
 
     # Time Base
 
-    time_base = waveform_property("TimeBase")
-
     TimeBase = read_attribute(
         dtype=(float,),
         max_dim_x=10**8,
         label="Time base",
         unit="s",
-        fget=time_base.read,
         doc="Time base value table",
     )
 
+    def read_TimeBase(self, attr):
+        value = []
+        if self.linspace_args is not None:
+            value = self.time_base_cache.get(self.linspace_args)
+        quality = PyTango.AttrQuality.ATTR_VALID
+        attr.set_value_date_quality(value, self.time_base_stamp, quality)
+
+    # Time Base parameters
+
+    time_base_start = waveform_property("TimeBaseStart")
+    time_base_step = waveform_property("TimeBaseStep")
+    time_base_length = waveform_property("TimeBaseLength")
+
+    TimeBaseStart = read_attribute(
+        dtype=float,
+        label="Time base start",
+        unit="s",
+        format="%.3e",
+        fget=time_base_start.read,
+        doc="First value of the time base",
+    )
+
+    TimeBaseStep = read_attribute(
+        dtype=float,
+        label="Time base step",
+        unit="s",
+        format="%.3e",
+        fget=time_base_step.read,
+        doc="Interval between two points of the time base",
+    )
+
+    TimeBaseLength = read_attribute(
+        dtype=int,
+        label="Time base length",
+        unit="point",
+        format="%d",
+        fget=time_base_length.read,
+        doc="Number of points in the time base",
+    )
+
 # ------------------------------------------------------------------
 #    Channel setting attributes
 # ------------------------------------------------------------------
@@ -552,8 +1501,9 @@ class ScopeDevice(RequestQueueDevice):
     channel_enabled_4 = settings_property("ChannelEnabled4")
 
     def write_channel_enabled(self, enabled, channel):
-        self.enqueue(self.scope.set_channel_enabled, channel, enabled)
-        self.enqueue(self.update_channel_enabled, channel)
+        self.enqueue_write(self.scope.set_channel_enabled,
+                           self.update_channel_enabled,
+                           channel, enabled)
 
     def update_channel_enabled(self, channel):
         enabled = self.scope.get_channel_enabled(channel)
@@ -583,8 +1533,9 @@ class ScopeDevice(RequestQueueDevice):
     channel_coupling_4 = settings_property("ChannelCoupling4")
 
     def write_channel_coupling(self, coupling, channel):
-        self.enqueue(self.scope.set_channel_coupling, channel, coupling)
-        self.enqueue(self.update_channel_coupling, channel)
+        self.enqueue_write(self.scope.set_channel_coupling,
+                           self.update_channel_coupling,
+                           channel, coupling)
 
     def update_channel_coupling(self, channel):
         coupling = self.scope.get_channel_coupling(channel)
@@ -617,8 +1568,9 @@ class ScopeDevice(RequestQueueDevice):
     channel_position_4 = settings_property("ChannelPosition4")
 
     def write_channel_position(self, position, channel):
-        self.enqueue(self.scope.set_channel_position, channel, position)
-        self.enqueue(self.update_channel_position, channel)
+        self.enqueue_write(self.scope.set_channel_position,
+                           self.update_channel_position,
+                           channel, position)
 
     def update_channel_position(self, channel):
         position = self.scope.get_channel_position(channel)
@@ -651,8 +1603,9 @@ class ScopeDevice(RequestQueueDevice):
     channel_scale_4 = settings_property("ChannelScale4")
 
     def write_channel_scale(self, scale, channel):
-        self.enqueue(self.scope.set_channel_scale, channel, scale)
-        self.enqueue(self.update_channel_scale, channel)
+        self.enqueue_write(self.scope.set_channel_scale,
+                           self.update_channel_scale,
+                           channel, scale)
 
     def update_channel_scale(self, channel):
         scale = self.scope.get_channel_scale(channel)
@@ -715,19 +1668,533 @@ class ScopeDevice(RequestQueueDevice):
                                attrs=[raw_waveform_1, raw_waveform_2,
                                       raw_waveform_3, raw_waveform_4]):
         return read_attribute(
-            dtype=(float,),
-            unit="div",
-            format="%4.3f",
+            dtype=(numpy.int16,),
+            format="%d",
             max_dim_x=10**8,
             fget=attrs[channel-1].read,
-            label="Waveform {0}".format(channel),
-            doc="Waveform data for channel {0}".format(channel))
+            label="Raw waveform {0}".format(channel),
+            doc="Raw ADC samples for channel {0}, unsigned with the "
+            "binary formats of the RTM".format(channel))
 
     RawWaveform1 = raw_waveform_attribute(1)
     RawWaveform2 = raw_waveform_attribute(2)
     RawWaveform3 = raw_waveform_attribute(3)
     RawWaveform4 = raw_waveform_attribute(4)
 
+    # Display waveforms
+
+    display_waveform_1 = waveform_property("DisplayWaveform1")
+    display_waveform_2 = waveform_property("DisplayWaveform2")
+    display_waveform_3 = waveform_property("DisplayWaveform3")
+    display_waveform_4 = waveform_property("DisplayWaveform4")
+
+    def display_waveform_attribute(channel,
+                                   attrs=[display_waveform_1,
+                                          display_waveform_2,
+                                          display_waveform_3,
+                                          display_waveform_4]):
+        return read_attribute(
+            dtype=(float,),
+            unit="V",
+            format="%4.3f",
+            max_dim_x=10**6,
+            fget=attrs[channel-1].read,
+            label="Display waveform {0}".format(channel),
+            doc="Min/max envelope of the waveform "
+            "for channel {0}".format(channel))
+
+    DisplayWaveform1 = display_waveform_attribute(1)
+    DisplayWaveform2 = display_waveform_attribute(2)
+    DisplayWaveform3 = display_waveform_attribute(3)
+    DisplayWaveform4 = display_waveform_attribute(4)
+
+    # Display time base
+
+    display_time_base = waveform_property("DisplayTimeBase")
+
+    DisplayTimeBase = read_attribute(
+        dtype=(float,),
+        max_dim_x=10**6,
+        label="Display time base",
+        unit="s",
+        fget=display_time_base.read,
+        doc="Time base for the display waveforms",
+    )
+
+    # Encoded waveforms
+
+    empty_encoding = "", ""
+    encoded_property = partial(waveform_property, default=empty_encoding)
+
+    encoded_waveform_1 = encoded_property("EncodedWaveform1")
+    encoded_waveform_2 = encoded_property("EncodedWaveform2")
+    encoded_waveform_3 = encoded_property("EncodedWaveform3")
+    encoded_waveform_4 = encoded_property("EncodedWaveform4")
+
+    def encoded_waveform_attribute(channel,
+                                   attrs=[encoded_waveform_1,
+                                          encoded_waveform_2,
+                                          encoded_waveform_3,
+                                          encoded_waveform_4]):
+        return read_attribute(
+            dtype=PyTango.DevEncoded,
+            fget=attrs[channel-1].read,
+            label="Encoded waveform {0}".format(channel),
+            doc="Raw samples for channel {0} with their JSON metadata, "
+            "see scopedevice.decode_waveform".format(channel))
+
+    EncodedWaveform1 = encoded_waveform_attribute(1)
+    EncodedWaveform2 = encoded_waveform_attribute(2)
+    EncodedWaveform3 = encoded_waveform_attribute(3)
+    EncodedWaveform4 = encoded_waveform_attribute(4)
+
+    # Segment waveforms
+
+    segment_waveform_1 = waveform_property("SegmentWaveform1")
+    segment_waveform_2 = waveform_property("SegmentWaveform2")
+    segment_waveform_3 = waveform_property("SegmentWaveform3")
+    segment_waveform_4 = waveform_property("SegmentWaveform4")
+
+    def segment_waveform_attribute(channel,
+                                   attrs=[segment_waveform_1,
+                                          segment_waveform_2,
+                                          segment_waveform_3,
+                                          segment_waveform_4]):
+        return read_attribute(
+            dtype=((float,),),
+            unit="V",
+            format="%4.3f",
+            max_dim_x=10**8,
+            max_dim_y=10**5,
+            fget=attrs[channel-1].read,
+            label="Segment waveforms {0}".format(channel),
+            doc="Waveforms of the segments for channel {0}, "
+            "one segment per row".format(channel))
+
+    SegmentWaveform1 = segment_waveform_attribute(1)
+    SegmentWaveform2 = segment_waveform_attribute(2)
+    SegmentWaveform3 = segment_waveform_attribute(3)
+    SegmentWaveform4 = segment_waveform_attribute(4)
+
+    # Segment stamps
+
+    segment_stamps = waveform_property("SegmentStamps")
+
+    SegmentStamps = read_attribute(
+        dtype=(float,),
+        unit="s",
+        max_dim_x=10**5,
+        fget=segment_stamps.read,
+        label="Segment stamps",
+        doc="Time stamps of the segments of the last acquisition",
+    )
+
+    # Accumulation
+
+    AccumulationMode = rw_attribute(
+        dtype=int,
+        min_value=0,
+        max_value=4,
+        format="%1d",
+        label="Accumulation mode",
+        doc="0 for none, 1 for running average, 2 for exponential "
+        "average, 3 for min-hold, 4 for max-hold",
+    )
+
+    def read_AccumulationMode(self):
+        return self.accumulation_mode
+
+    def write_AccumulationMode(self, mode):
+        self.accumulation_mode = mode
+        self.reset_accumulation()
+
+    AccumulationCount = rw_attribute(
+        dtype=int,
+        min_value=1,
+        max_value=10**4,
+        format="%d",
+        label="Accumulation count",
+        doc="Number of acquisitions for the running average, "
+        "and inverse weight for the exponential average. The running "
+        "average is limited by the AccumulationMemory property.",
+    )
+
+    def read_AccumulationCount(self):
+        return self.accumulation_count
+
+    def write_AccumulationCount(self, count):
+        self.accumulation_count = count
+        self.reset_accumulation()
+
+    def reset_accumulation(self):
+        for accumulator in self.accumulators.values():
+            accumulator.reset()
+
+# ------------------------------------------------------------------
+#    Statistics attributes
+# ------------------------------------------------------------------
+
+    def statistic_attribute(prop, name, channel):
+        return read_attribute(
+            dtype=float,
+            unit="V",
+            format="%4.3f",
+            fget=prop.read,
+            label="Waveform {0} {1}".format(name, channel),
+            doc="Waveform {0} for channel {1}".format(name, channel))
+
+    # Mean
+
+    waveform_mean_1 = statistics_property("WaveformMean1")
+    waveform_mean_2 = statistics_property("WaveformMean2")
+    waveform_mean_3 = statistics_property("WaveformMean3")
+    waveform_mean_4 = statistics_property("WaveformMean4")
+
+    WaveformMean1 = statistic_attribute(waveform_mean_1, "mean", 1)
+    WaveformMean2 = statistic_attribute(waveform_mean_2, "mean", 2)
+    WaveformMean3 = statistic_attribute(waveform_mean_3, "mean", 3)
+    WaveformMean4 = statistic_attribute(waveform_mean_4, "mean", 4)
+
+    # RMS
+
+    waveform_rms_1 = statistics_property("WaveformRms1")
+    waveform_rms_2 = statistics_property("WaveformRms2")
+    waveform_rms_3 = statistics_property("WaveformRms3")
+    waveform_rms_4 = statistics_property("WaveformRms4")
+
+    WaveformRms1 = statistic_attribute(waveform_rms_1, "RMS", 1)
+    WaveformRms2 = statistic_attribute(waveform_rms_2, "RMS", 2)
+    WaveformRms3 = statistic_attribute(waveform_rms_3, "RMS", 3)
+    WaveformRms4 = statistic_attribute(waveform_rms_4, "RMS", 4)
+
+    # Minimum
+
+    waveform_min_1 = statistics_property("WaveformMin1")
+    waveform_min_2 = statistics_property("WaveformMin2")
+    waveform_min_3 = statistics_property("WaveformMin3")
+    waveform_min_4 = statistics_property("WaveformMin4")
+
+    WaveformMin1 = statistic_attribute(waveform_min_1, "minimum", 1)
+    WaveformMin2 = statistic_attribute(waveform_min_2, "minimum", 2)
+    WaveformMin3 = statistic_attribute(waveform_min_3, "minimum", 3)
+    WaveformMin4 = statistic_attribute(waveform_min_4, "minimum", 4)
+
+    # Maximum
+
+    waveform_max_1 = statistics_property("WaveformMax1")
+    waveform_max_2 = statistics_property("WaveformMax2")
+    waveform_max_3 = statistics_property("WaveformMax3")
+    waveform_max_4 = statistics_property("WaveformMax4")
+
+    WaveformMax1 = statistic_attribute(waveform_max_1, "maximum", 1)
+    WaveformMax2 = statistic_attribute(waveform_max_2, "maximum", 2)
+    WaveformMax3 = statistic_attribute(waveform_max_3, "maximum", 3)
+    WaveformMax4 = statistic_attribute(waveform_max_4, "maximum", 4)
+
+    # Peak to peak
+
+    waveform_peak_to_peak_1 = statistics_property("WaveformPeakToPeak1")
+    waveform_peak_to_peak_2 = statistics_property("WaveformPeakToPeak2")
+    waveform_peak_to_peak_3 = statistics_property("WaveformPeakToPeak3")
+    waveform_peak_to_peak_4 = statistics_property("WaveformPeakToPeak4")
+
+    WaveformPeakToPeak1 = statistic_attribute(
+        waveform_peak_to_peak_1, "peak-to-peak", 1)
+    WaveformPeakToPeak2 = statistic_attribute(
+        waveform_peak_to_peak_2, "peak-to-peak", 2)
+    WaveformPeakToPeak3 = statistic_attribute(
+        waveform_peak_to_peak_3, "peak-to-peak", 3)
+    WaveformPeakToPeak4 = statistic_attribute(
+        waveform_peak_to_peak_4, "peak-to-peak", 4)
+
+    # Standard deviation
+
+    waveform_std_1 = statistics_property("WaveformStd1")
+    waveform_std_2 = statistics_property("WaveformStd2")
+    waveform_std_3 = statistics_property("WaveformStd3")
+    waveform_std_4 = statistics_property("WaveformStd4")
+
+    WaveformStd1 = statistic_attribute(waveform_std_1, "deviation", 1)
+    WaveformStd2 = statistic_attribute(waveform_std_2, "deviation", 2)
+    WaveformStd3 = statistic_attribute(waveform_std_3, "deviation", 3)
+    WaveformStd4 = statistic_attribute(waveform_std_4, "deviation", 4)
+
+# ------------------------------------------------------------------
+#    Decoding attributes
+# ------------------------------------------------------------------
+
+    # Dropped acquisitions
+
+    DroppedAcquisitions = read_attribute(
+        dtype=int,
+        label="Dropped acquisitions",
+        format="%d",
+        doc="Number of acquisitions dropped by the decoding queue",
+    )
+
+    def read_DroppedAcquisitions(self):
+        return self.decoding_queue.dropped
+
+    # Decoding queue depth
+
+    DecodingQueueDepth = read_attribute(
+        dtype=int,
+        label="Decoding queue depth",
+        format="%d",
+        doc="Number of acquisitions waiting to be decoded",
+    )
+
+    def read_DecodingQueueDepth(self):
+        return self.decoding_queue.qsize()
+
+# ------------------------------------------------------------------
+#    Request queue attributes
+# ------------------------------------------------------------------
+
+    # Request queue length
+
+    RequestQueueLength = read_attribute(
+        dtype=int,
+        label="Request queue length",
+        format="%d",
+        doc="Number of requests waiting to be processed",
+    )
+
+    def read_RequestQueueLength(self):
+        return len(self.request_queue)
+
+    # Request latency
+
+    RequestLatency = read_attribute(
+        dtype=float,
+        label="Request latency",
+        unit="s",
+        format="%5.3f",
+        doc="Mean time between the enqueuing and the processing "
+        "of the requests",
+    )
+
+    def read_RequestLatency(self):
+        return self.queue_statistics.mean
+
+    # Last request latency
+
+    LastRequestLatency = read_attribute(
+        dtype=float,
+        label="Last request latency",
+        unit="s",
+        format="%5.3f",
+        doc="Latency of the last processed request",
+    )
+
+    def read_LastRequestLatency(self):
+        return self.queue_statistics.last
+
+    # Max request latency
+
+    MaxRequestLatency = read_attribute(
+        dtype=float,
+        label="Max request latency",
+        unit="s",
+        format="%5.3f",
+        doc="Maximum latency of the processed requests",
+    )
+
+    def read_MaxRequestLatency(self):
+        return self.queue_statistics.max
+
+    # Coalesced requests
+
+    CoalescedRequests = read_attribute(
+        dtype=int,
+        label="Coalesced requests",
+        format="%d",
+        doc="Number of setting writes replaced by a newer write "
+        "before being sent",
+    )
+
+    def read_CoalescedRequests(self):
+        return self.queue_statistics.coalesced
+
+# ------------------------------------------------------------------
+#    Scheduler attributes
+# ------------------------------------------------------------------
+
+    # Scheduled tasks
+
+    ScheduledTasks = read_attribute(
+        dtype=(str,),
+        max_dim_x=16,
+        label="Scheduled tasks",
+        doc="Names of the tasks of the scope thread, "
+        "in the order of the other scheduler attributes",
+    )
+
+    def read_ScheduledTasks(self):
+        return [task.name for task in self.scheduler.tasks]
+
+    # Task periods
+
+    TaskPeriods = read_attribute(
+        dtype=(float,),
+        max_dim_x=16,
+        label="Task periods",
+        unit="s",
+        format="%5.3f",
+        doc="Period of each task (0 to run as soon as needed)",
+    )
+
+    def read_TaskPeriods(self):
+        return [task.period for task in self.scheduler.tasks]
+
+    # Task overruns
+
+    TaskOverruns = read_attribute(
+        dtype=(int,),
+        max_dim_x=16,
+        label="Task overruns",
+        format="%d",
+        doc="Number of times each task missed its next deadline",
+    )
+
+    def read_TaskOverruns(self):
+        return [task.overruns for task in self.scheduler.tasks]
+
+    # Task jitter
+
+    TaskJitter = read_attribute(
+        dtype=(float,),
+        max_dim_x=16,
+        label="Task jitter",
+        unit="s",
+        format="%5.3f",
+        doc="Mean delay between the deadline and the start of each task",
+    )
+
+    def read_TaskJitter(self):
+        return [task.mean_jitter for task in self.scheduler.tasks]
+
+    # Task max jitter
+
+    TaskMaxJitter = read_attribute(
+        dtype=(float,),
+        max_dim_x=16,
+        label="Task max jitter",
+        unit="s",
+        format="%5.3f",
+        doc="Maximum delay between the deadline and the start of each task",
+    )
+
+    def read_TaskMaxJitter(self):
+        return [task.max_jitter for task in self.scheduler.tasks]
+
+    # Task durations
+
+    TaskDurations = read_attribute(
+        dtype=(float,),
+        max_dim_x=16,
+        label="Task durations",
+        unit="s",
+        format="%5.3f",
+        doc="Duration of the last run of each task",
+    )
+
+    def read_TaskDurations(self):
+        return [task.duration for task in self.scheduler.tasks]
+
+# ------------------------------------------------------------------
+#    History attributes
+# ------------------------------------------------------------------
+
+    # Acquisition sequence
+
+    AcquisitionSequence = read_attribute(
+        dtype=int,
+        label="Acquisition sequence",
+        format="%d",
+        doc="Sequence number of the last acquisition",
+    )
+
+    def read_AcquisitionSequence(self):
+        return self.acquisition_sequence
+
+    # Acquisition pipe
+
+    if pipe is not None:
+        Acquisition = pipe(
+            label="Acquisition",
+            doc="Last acquisition with its stamp, sequence number, enabled "
+            "channels, conversion factors, time base parameters and "
+            "waveforms",
+        )
+
+    def read_Acquisition(self):
+        return self.acquisition_blob
+
+    def get_history(self):
+        """Return the history, or raise an error if it is disabled."""
+        if self.history is None:
+            raise ValueError("The history is disabled (HistoryDepth is 0)")
+        return self.history
+
+# ------------------------------------------------------------------
+#    Recording attributes
+# ------------------------------------------------------------------
+
+    # Recording
+
+    Recording = read_attribute(
+        dtype=bool,
+        label="Recording",
+        doc="True if the acquisitions are being recorded",
+    )
+
+    def read_Recording(self):
+        return self.recorder is not None and self.recorder.active
+
+    # Recording throughput
+
+    RecordingThroughput = read_attribute(
+        dtype=float,
+        label="Recording throughput",
+        unit="MB/s",
+        format="%6.2f",
+        doc="Average amount of samples written per second",
+    )
+
+    def read_RecordingThroughput(self):
+        if self.recorder is None:
+            return 0.0
+        return self.recorder.throughput
+
+    # Recording backlog
+
+    RecordingBacklog = read_attribute(
+        dtype=int,
+        label="Recording backlog",
+        format="%d",
+        doc="Number of acquisitions waiting to be written",
+    )
+
+    def read_RecordingBacklog(self):
+        if self.recorder is None:
+            return 0
+        return self.recorder.backlog
+
+    # Recording dropped frames
+
+    RecordingDroppedFrames = read_attribute(
+        dtype=int,
+        label="Recording dropped frames",
+        format="%d",
+        doc="Number of acquisitions that have not been recorded",
+    )
+
+    def read_RecordingDroppedFrames(self):
+        if self.recorder is None:
+            return 0
+        return self.recorder.dropped
+
 # ------------------------------------------------------------------
 #    Trigger attributes
 # ------------------------------------------------------------------
@@ -741,8 +2208,9 @@ class ScopeDevice(RequestQueueDevice):
     trigger_level_5 = settings_property("TriggerLevel5")
 
     def write_trigger_level(self, level, channel):
-        self.enqueue(self.scope.set_trigger_level, channel, level)
-        self.enqueue(self.update_trigger_level, channel)
+        self.enqueue_write(self.scope.set_trigger_level,
+                           self.update_trigger_level,
+                           channel, level)
 
     def update_trigger_level(self, channel):
         level = self.scope.get_trigger_level(channel)
@@ -783,8 +2251,9 @@ class ScopeDevice(RequestQueueDevice):
     )
 
     def write_TriggerSlope(self, slope):
-        self.enqueue(self.scope.set_trigger_slope, slope)
-        self.enqueue(self.update_trigger_slope)
+        self.enqueue_write(self.scope.set_trigger_slope,
+                           self.update_trigger_slope,
+                           slope)
 
     def update_trigger_slope(self):
         self.trigger_slope = self.scope.get_trigger_slope()
@@ -807,8 +2276,9 @@ class ScopeDevice(RequestQueueDevice):
         return self.trigger_source
 
     def write_TriggerSource(self, source):
-        self.enqueue(self.scope.set_trigger_source, source)
-        self.enqueue(self.update_trigger_source)
+        self.enqueue_write(self.scope.set_trigger_source,
+                           self.update_trigger_source,
+                           source)
 
     def update_trigger_source(self):
         self.trigger_source = self.scope.get_trigger_source()
@@ -827,8 +2297,9 @@ class ScopeDevice(RequestQueueDevice):
     )
 
     def write_TriggerCoupling(self, coupling):
-        self.enqueue(self.scope.set_trigger_coupling, coupling)
-        self.enqueue(self.update_trigger_coupling)
+        self.enqueue_write(self.scope.set_trigger_coupling,
+                           self.update_trigger_coupling,
+                           coupling)
 
     def update_trigger_coupling(self):
         self.trigger_coupling = self.scope.get_trigger_coupling()
@@ -881,6 +2352,104 @@ class ScopeDevice(RequestQueueDevice):
     def is_Disconnect_allowed(self):
         return self.steady_state(DevState.ON)
 
+    # Reset accumulation command
+
+    @command
+    def ResetAccumulation(self):
+        """Restart the waveform accumulation with the next acquisition."""
+        self.reset_accumulation()
+
+    def is_ResetAccumulation_allowed(self):
+        return self.is_write_allowed()
+
+    # History commands
+
+    @command(
+        dtype_out=(int,),
+        doc_out="Sequence numbers of the stored acquisitions, oldest first",
+    )
+    def GetHistorySequences(self):
+        """List the sequence numbers of the acquisitions in the history."""
+        return self.get_history().get_index()[0]
+
+    @command(
+        dtype_out=(float,),
+        doc_out="Stamps of the stored acquisitions, oldest first",
+    )
+    def GetHistoryStamps(self):
+        """List the stamps of the acquisitions in the history."""
+        return self.get_history().get_index()[1]
+
+    @command(
+        dtype_in=float,
+        doc_in="Time stamp",
+        dtype_out=int,
+        doc_out="Sequence number of the last acquisition at or before "
+        "the stamp",
+    )
+    def GetHistorySequence(self, stamp):
+        """Find the acquisition corresponding to a stamp."""
+        return self.get_history().find(stamp)
+
+    @command(
+        dtype_in=(int,),
+        doc_in="Channel and sequence number",
+        dtype_out=(float,),
+        doc_out="Waveform of the stored acquisition",
+    )
+    def GetHistoryWaveform(self, args):
+        """Get the waveform of a channel for a stored acquisition."""
+        channel, sequence = args
+        return self.get_history().get_waveform(channel, sequence)
+
+    @command(
+        dtype_in=(int,),
+        doc_in="Channel, first and last sequence numbers",
+        dtype_out=(float,),
+        doc_out="Concatenated waveforms of the stored acquisitions",
+    )
+    def GetHistoryWaveforms(self, args):
+        """Get the waveforms of a channel for a range of acquisitions."""
+        channel, first, last = args
+        return self.get_history().get_waveforms(channel, first, last).ravel()
+
+    # Recording commands
+
+    @command(
+        dtype_in=str,
+        doc_in="Path of the HDF5 file (.h5 or .hdf5) or of the directory "
+        "of .npy files, inside the RecordingDirectory property",
+    )
+    def StartRecording(self, path):
+        """Start recording the acquisitions. Available in ON and RUNNING
+        state."""
+        if self.recorder is not None and self.recorder.active:
+            raise ValueError("A recording is already in progress")
+        if not self.RecordingDirectory:
+            raise ValueError("The RecordingDirectory property is not defined")
+        path = resolve_path(self.RecordingDirectory, path)
+        self.recorder = Recorder(
+            path, self.get_settings_snapshot(), self.RecordingQueueSize,
+            self.RecordingChunkMemory * 2**20)
+        self.recording_path = path
+
+    def is_StartRecording_allowed(self):
+        return self.is_write_allowed()
+
+    @command
+    def StopRecording(self):
+        """Write the pending acquisitions and stop recording."""
+        self.stop_recording()
+
+    def stop_recording(self):
+        """Stop the recorder, if any."""
+        if self.recorder is None:
+            return
+        self.info_stream("Joining the recording thread...")
+        self.recorder.stop(self.callback_timeout)
+        if self.recorder.active:
+            self.error_stream("Cannot join the recording thread")
+
     # Execute command
 
     @command(
@@ -893,14 +2462,62 @@ class ScopeDevice(RequestQueueDevice):
     def Execute(self, command):
         """Execute a custom command. Available in ON and RUNNING state."""
         command = " ".join(command)
-        # Run command
+        return self.execute_request(self.scope.issue_command, command)
+
+    def is_Execute_allowed(self):
+        return self.is_custom_command_allowed()
+
+    # Execute many command
+
+    @command(
+        dtype_in=(str,),
+        doc_in="SCPI commands",
+        dtype_out=(str,),
+        doc_out="Returns the reply of each query, DONE for the other "
+        "commands, or a single error message",
+    )
+    def ExecuteMany(self, commands):
+        """Execute several custom commands in a single message.
+        Available in ON and RUNNING state."""
+        result = self.execute_request(self.issue_commands, commands)
+        if isinstance(result, basestring):
+            return [result]
+        return result
+
+    def is_ExecuteMany_allowed(self):
+        return self.is_custom_command_allowed()
+
+    def issue_commands(self, commands):
+        """Issue several commands and return the reply for each of them."""
+        queries = [index for index, command in enumerate(commands)
+                   if "?" in command]
+        reply = self.scope.issue_command(join_commands(commands))
+        replies = ["DONE"] * len(commands)
+        if queries:
+            for index, value in zip(queries,
+                                    split_reply(reply, len(queries))):
+                replies[index] = value
+        return replies
+
+    def execute_request(self, func, *args):
+        """Run a custom command in the scope thread and wait for it.
+
+        The instrument errors are returned as strings.
+        """
+        future = self.submit(func, *args)
         try:
-            return str(self.scope.issue_command(command))
+            result = future.result(self.execute_timeout)
+        except RequestTimeout as exc:
+            return str(exc)
         except Vxi11Exception as exc:
             if exc.err != 15:
                 return repr(exc)
             msg = "No response from the scope (timeout = {0:3.1f} s)"
             return msg.format(self.instrument_timeout)
+        if isinstance(result, list):
+            return result
+        return str(result)
 
-    def is_Execute_allowed(self):
-        return self.steady_state(DevState.ON)
+    def is_custom_command_allowed(self):
+        return (self.steady_state(DevState.ON, False) or
+                self.steady_state(DevState.RUNNING))
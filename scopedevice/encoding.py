@@ -0,0 +1,80 @@
+"""Provide the encoding of the waveforms as DevEncoded values."""
+
+# Imports
+import json
+import zlib
+import numpy
+
+# Optional LZ4 support
+try:
+    import lz4.block as lz4
+except ImportError:
+    lz4 = None
+
+
+# Compression functions
+def lz4_compress(data, level):
+    """Compress using LZ4, with a high compression mode above level 1."""
+    if level > 1:
+        return lz4.compress(data, mode="high_compression",
+                            compression=level)
+    return lz4.compress(data)
+
+
+compressors = {
+    "none": lambda data, level: data,
+    "zlib": zlib.compress,
+}
+
+decompressors = {
+    "none": lambda data: data,
+    "zlib": zlib.decompress,
+}
+
+if lz4 is not None:
+    compressors["lz4"] = lz4_compress
+    decompressors["lz4"] = lz4.decompress
+
+
+def check_compression(compression):
+    """Raise a ValueError if the compression is not available."""
+    if compression not in compressors:
+        msg = "Invalid compression: {0!r} (expected one of {1})"
+        choices = ", ".join(sorted(compressors))
+        raise ValueError(msg.format(compression, choices))
+
+
+# Encoding
+def encode_waveform(raw, gain, offset, compression="none", level=1,
+                    **metadata):
+    """Encode raw samples as a (format, data) DevEncoded value.
+
+    The format is a JSON string with the sample type, the number of
+    samples, the (gain, offset) conversion factors, the compression and
+    the additional metadata. The data is handed over through the buffer
+    interface of the samples, so they are not copied without compression.
+    """
+    raw = numpy.ascontiguousarray(raw)
+    data = compressors[compression](raw, level)
+    metadata.update(dtype=raw.dtype.str, length=len(raw), gain=float(gain),
+                    offset=float(offset), compression=compression)
+    return json.dumps(metadata, sort_keys=True), data
+
+
+def decode_waveform(encoded, raw=False):
+    """Decode a value read from an EncodedWaveform attribute.
+
+    Args:
+        encoded (tuple): (format, data) DevEncoded value
+        raw (bool): return the raw samples instead of the waveform
+
+    Returns:
+        the waveform as a float64 array, or the raw samples
+    """
+    fmt, data = encoded
+    metadata = json.loads(fmt)
+    data = decompressors[metadata["compression"]](data)
+    samples = numpy.frombuffer(data, metadata["dtype"], metadata["length"])
+    if raw:
+        return samples
+    return samples * metadata["gain"] + metadata["offset"]
@@ -0,0 +1,107 @@
+"""Provide a ring buffer holding the last acquisitions."""
+
+# Imports
+import numpy
+import threading
+from scopedevice.waveform import convert_waveform
+
+
+# Acquisition history
+class AcquisitionHistory(object):
+    """Preallocated circular buffer of the last `depth` acquisitions.
+
+    The raw samples of every channel are stored along with the stamp,
+    the sequence number and the conversion factors of the acquisition,
+    so the waveforms are converted on retrieval only. The sample buffer
+    is allocated when the record length or the sample type changes, and
+    the acquisitions are then copied into it without any allocation.
+    If a path is given, the sample buffer is a memory-mapped file.
+    """
+
+    def __init__(self, depth, channels, path=None):
+        """Initialize the history."""
+        self.depth = depth
+        self.channels = list(channels)
+        self.path = path
+        self.lock = threading.Lock()
+        size = len(self.channels)
+        self.stamps = numpy.zeros(depth, numpy.float64)
+        self.sequences = numpy.full(depth, -1, numpy.int64)
+        self.lengths = numpy.zeros((depth, size), numpy.intp)
+        self.factors = numpy.zeros((depth, size, 2), numpy.float64)
+        self.samples = None
+        self.key = None
+
+    def allocate(self, key):
+        """Allocate the sample buffer and clear the history."""
+        length, dtype = key
+        shape = self.depth, len(self.channels), length
+        if self.path:
+            self.samples = numpy.memmap(self.path, dtype, "w+", shape=shape)
+        else:
+            self.samples = numpy.empty(shape, dtype)
+        self.sequences.fill(-1)
+        self.key = key
+
+    def store(self, sequence, stamp, data, factors):
+        """Store the raw samples of an acquisition.
+
+        Args:
+            sequence (int): sequence number of the acquisition
+            stamp (float): time stamp of the acquisition
+            data (dict): raw samples for each channel
+            factors (dict): (gain, offset) factors for each channel
+        """
+        arrays = [numpy.asarray(data.get(channel, []))
+                  for channel in self.channels]
+        length = max(len(array) for array in arrays)
+        if not length:
+            return
+        dtype = max(arrays, key=len).dtype
+        index = sequence % self.depth
+        with self.lock:
+            if self.key != (length, dtype):
+                self.allocate((length, dtype))
+            for i, (channel, array) in enumerate(zip(self.channels, arrays)):
+                self.samples[index, i, :len(array)] = array
+                self.lengths[index, i] = len(array)
+                self.factors[index, i] = factors.get(channel, (1.0, 0.0))
+            self.stamps[index] = stamp
+            self.sequences[index] = sequence
+
+    def get_index(self):
+        """Return the stored (sequences, stamps) arrays, oldest first."""
+        with self.lock:
+            order = numpy.argsort(self.sequences)
+            order = order[self.sequences[order] >= 0]
+            return self.sequences[order], self.stamps[order]
+
+    def find(self, stamp):
+        """Return the sequence of the last acquisition at or before stamp."""
+        sequences, stamps = self.get_index()
+        position = numpy.searchsorted(stamps, stamp, side="right") - 1
+        if position < 0:
+            raise KeyError("No acquisition at or before {0}".format(stamp))
+        return int(sequences[position])
+
+    def get_waveform(self, channel, sequence):
+        """Return the converted waveform of a stored acquisition."""
+        i = self.channels.index(channel)
+        index = sequence % self.depth
+        with self.lock:
+            if sequence < 0 or self.sequences[index] != sequence:
+                msg = "Acquisition {0} is not stored"
+                raise KeyError(msg.format(sequence))
+            raw = self.samples[index, i, :self.lengths[index, i]]
+            gain, offset = self.factors[index, i]
+            return convert_waveform(raw, gain, offset)
+
+    def get_waveforms(self, channel, first, last):
+        """Return the waveforms of a sequence range as a 2D array."""
+        if last < first:
+            raise ValueError("Invalid sequence range")
+        waveforms = [self.get_waveform(channel, sequence)
+                     for sequence in range(first, last + 1)]
+        if len(set(map(len, waveforms))) > 1:
+            raise ValueError("The waveforms have different lengths")
+        return numpy.array(waveforms)
@@ -0,0 +1,244 @@
+"""Provide a recorder streaming the acquisitions to disk."""
+
+# Imports
+import os
+import json
+import time
+import numpy
+import threading
+from scopedevice.common import AcquisitionQueue
+
+# Optional HDF5 support
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+# HDF5 extensions
+HDF5_EXTENSIONS = (".h5", ".hdf5")
+
+
+# Path helper
+def resolve_path(directory, path):
+    """Return the absolute path of a recording inside a directory.
+
+    A ValueError is raised if the path is empty or resolves outside the
+    directory (e.g. absolute path, parent directory or symbolic link).
+    """
+    root = os.path.realpath(directory)
+    result = os.path.realpath(os.path.join(root, path))
+    relative = os.path.relpath(result, root)
+    if relative == os.curdir or relative == os.pardir or \
+       relative.startswith(os.pardir + os.sep):
+        msg = "Invalid recording path: {0!r} (not inside {1})"
+        raise ValueError(msg.format(path, directory))
+    return result
+
+
+# Writers
+class NpyWriter(object):
+    """Write the acquisitions as chunks of .npy files in a directory.
+
+    Each chunk `n` is made of the files `n_sequences.npy`,
+    `n_stamps.npy`, and `n_factors<channel>.npy` and
+    `n_waveform<channel>.npy` for each recorded channel.
+    """
+
+    def __init__(self, path, settings):
+        """Create the directory and write the settings."""
+        self.path = path
+        self.chunk = 0
+        os.makedirs(path)
+        with open(os.path.join(path, "settings.json"), "w") as f:
+            json.dump(settings, f, indent=2, default=str)
+
+    def write(self, sequences, stamps, factors, samples):
+        """Write a chunk of acquisitions."""
+        arrays = {"sequences": sequences, "stamps": stamps}
+        for channel, array in samples.items():
+            arrays["factors{0}".format(channel)] = factors[channel]
+            arrays["waveform{0}".format(channel)] = array
+        for name, array in arrays.items():
+            filename = "{0:05d}_{1}.npy".format(self.chunk, name)
+            numpy.save(os.path.join(self.path, filename), array)
+        self.chunk += 1
+
+    def close(self):
+        """Nothing to release."""
+
+
+class HDF5Writer(object):
+    """Write the acquisitions to resizable datasets of an HDF5 file.
+
+    The settings are stored as a JSON string in the `settings`
+    attribute of the file.
+    """
+
+    def __init__(self, path, settings):
+        """Create the file and write the settings."""
+        if h5py is None:
+            raise ValueError("HDF5 recording requires the h5py package")
+        self.file = h5py.File(path, "w-")
+        self.file.attrs["settings"] = json.dumps(settings, default=str)
+
+    def append(self, name, array):
+        """Append a chunk to a dataset, creating it if necessary."""
+        if name not in self.file:
+            self.file.create_dataset(
+                name, data=array, chunks=array.shape,
+                maxshape=(None,) + array.shape[1:])
+            return
+        dataset = self.file[name]
+        size = len(dataset)
+        dataset.resize(size + len(array), axis=0)
+        dataset[size:] = array
+
+    def write(self, sequences, stamps, factors, samples):
+        """Write a chunk of acquisitions."""
+        self.append("sequences", sequences)
+        self.append("stamps", stamps)
+        for channel, array in samples.items():
+            self.append("factors{0}".format(channel), factors[channel])
+            self.append("waveform{0}".format(channel), array)
+        self.file.flush()
+
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+
+# Recorder
+class Recorder(object):
+    """Stream the acquisitions to disk from a dedicated writer thread.
+
+    The acquisitions are fed through a bounded queue that drops the
+    oldest items when the disk cannot keep up. The raw samples of the
+    enabled channels are gathered in preallocated chunks of at most
+    `chunk_memory` bytes, along with the stamps, sequence numbers and
+    (gain, offset) conversion factors. A chunk holds at least one
+    acquisition. The file format is HDF5 if the path has an HDF5
+    extension, and a directory of .npy chunks otherwise.
+
+    The enabled channels and the record length of the first acquisition
+    are recorded. The acquisitions with other channels or another record
+    length are not recorded and are counted as dropped.
+    """
+
+    def __init__(self, path, settings, queue_size=64,
+                 chunk_memory=64 * 2**20):
+        """Open the output and start the writer thread."""
+        self.chunk_memory = chunk_memory
+        self.chunk_size = 0
+        if os.path.splitext(path)[1].lower() in HDF5_EXTENSIONS:
+            self.writer = HDF5Writer(path, settings)
+        else:
+            self.writer = NpyWriter(path, settings)
+        self.queue = AcquisitionQueue(queue_size, "drop_oldest")
+        self.key = None
+        self.filled = 0
+        self.rejected = 0
+        self.written = 0
+        self.error = ""
+        self.start = time.time()
+        self.stop_time = None
+        self.thread = threading.Thread(target=self.run)
+        self.thread.start()
+
+    # Producer interface
+
+    def put(self, sequence, stamp, data, factors):
+        """Queue an acquisition for writing."""
+        self.queue.put((sequence, stamp, data, dict(factors)))
+
+    def stop(self, timeout=None):
+        """Write the pending acquisitions and stop the writer thread."""
+        self.queue.interrupt()
+        self.thread.join(timeout)
+
+    # Counters
+
+    @property
+    def active(self):
+        return self.thread.is_alive()
+
+    @property
+    def backlog(self):
+        return self.queue.qsize()
+
+    @property
+    def dropped(self):
+        return self.queue.dropped + self.rejected
+
+    @property
+    def throughput(self):
+        """Average throughput in MB/s since the start of the recording."""
+        stop = self.stop_time or time.time()
+        return self.written / max(stop - self.start, 1e-9) / 1e6
+
+    # Writer thread
+
+    def run(self):
+        """Write the queued acquisitions until interrupted."""
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                self.add(*item)
+            self.flush()
+        except Exception as exc:
+            self.error = str(exc)
+        finally:
+            self.stop_time = time.time()
+            self.writer.close()
+
+    def allocate(self, key):
+        """Allocate the chunk buffers within the chunk memory."""
+        channels, length, dtype = key
+        frame = len(channels) * length * numpy.dtype(dtype).itemsize
+        self.chunk_size = size = max(self.chunk_memory // frame, 1)
+        self.sequences = numpy.zeros(size, numpy.int64)
+        self.stamps = numpy.zeros(size, numpy.float64)
+        self.factors = numpy.zeros((len(channels), size, 2), numpy.float64)
+        self.samples = numpy.zeros((len(channels), size, length), dtype)
+        self.key = key
+
+    def add(self, sequence, stamp, data, factors):
+        """Copy an acquisition into the current chunk."""
+        arrays = dict((channel, numpy.asarray(array))
+                      for channel, array in data.items() if len(array))
+        if not arrays:
+            return
+        channels = tuple(sorted(arrays))
+        longest = max(arrays.values(), key=len)
+        key = channels, len(longest), longest.dtype
+        if self.key is None:
+            self.allocate(key)
+        if key != self.key:
+            self.rejected += 1
+            return
+        index = self.filled
+        for i, channel in enumerate(channels):
+            array = arrays[channel]
+            self.samples[i, index, :len(array)] = array
+            self.samples[i, index, len(array):] = 0
+            self.factors[i, index] = factors.get(channel, (1.0, 0.0))
+        self.sequences[index] = sequence
+        self.stamps[index] = stamp
+        self.filled += 1
+        if self.filled == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the current chunk."""
+        count, self.filled = self.filled, 0
+        if not count:
+            return
+        channels = self.key[0]
+        factors = dict((channel, self.factors[i, :count])
+                       for i, channel in enumerate(channels))
+        samples = dict((channel, self.samples[i, :count])
+                       for i, channel in enumerate(channels))
+        self.writer.write(self.sequences[:count], self.stamps[:count],
+                          factors, samples)
+        self.written += sum(array.nbytes for array in samples.values())
@@ -5,7 +5,8 @@ from rohdescope import RTMConnection
 
 # Common imports
 from scopedevice.device import ScopeDevice
-from scopedevice.common import read_attribute, DeviceMeta, safe_traceback
+from scopedevice.common import (read_attribute, DeviceMeta, safe_traceback,
+                                scpi_enum)
 
 
 # Generic scope device
@@ -16,6 +17,32 @@ class RTMScope(ScopeDevice):
     # Library
     connection_class = RTMConnection
 
+    # Acquisition control
+    # The scope runs continuously (see prepare_acquisition),
+    # so the acquisitions are not armed by the device
+    acquisition_arm_command = None
+
+    # Binary transfer formats
+    binary_formats = {
+        "int8": ("UINT,8", "u1", 128., 25.),
+        "int16": ("UINT,16", "<u2", 32768., 6400.),
+    }
+
+    # Segmented acquisition
+    segmented_setup_command = (
+        "ACQuire:SEGMented:STATe ON;:ACQuire:NSINgle:COUNt {0}")
+
+    # Settings queries
+    settings_queries = dict(
+        ScopeDevice.settings_queries,
+        time_position=("TIMebase:POSition?", float),
+        trigger_source=("TRIGger:A:SOURce?", scpi_enum(
+            None, "CH1", "CH2", "CH3", "CH4", "EXTernanalog")),
+        trigger_slope=("TRIGger:A:EDGE:SLOPe?", scpi_enum(
+            "NEGative", "POSitive", "EITHer")),
+        trigger_level=("TRIGger:A:LEVel{0}?", float),
+    )
+
     # Prepare acquisition
     def prepare_acquisition(self):
         """Prepare the acquisition."""
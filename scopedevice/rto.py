@@ -5,7 +5,7 @@ from rohdescope import RTOConnection
 
 # Common imports
 from scopedevice.device import ScopeDevice
-from scopedevice.common import rw_attribute, DeviceMeta, partial
+from scopedevice.common import rw_attribute, DeviceMeta, partial, scpi_enum
 
 
 # RTO scope device
@@ -16,6 +16,30 @@ class RTOScope(ScopeDevice):
     # Library
     connection_class = RTOConnection
 
+    # Acquisition control
+    acquisition_arm_command = "*CLS;RUNSingle;*OPC"
+
+    # Binary transfer formats
+    binary_formats = {
+        "int8": ("INT,8", "i1", 0., 25.4),
+        "int16": ("INT,16", "<i2", 0., 6502.4),
+    }
+
+    # Settings queries
+    settings_queries = dict(
+        ScopeDevice.settings_queries,
+        time_position=("TIMebase:HORizontal:POSition?", float),
+        trigger_source=("TRIGger1:SOURce?", scpi_enum(
+            None, "CHAN1", "CHAN2", "CHAN3", "CHAN4", "EXTernanalog")),
+        trigger_slope=("TRIGger1:EDGE:SLOPe?", scpi_enum(
+            "NEGative", "POSitive", "EITHer")),
+        trigger_coupling=("TRIGger1:ANEDge:COUPling?", scpi_enum(
+            "DC", "AC", "DCLimit")),
+        trigger_level=("TRIGger1:LEVel{0}?", float),
+        channel_coupling=("CHANnel{0}:COUPling?", scpi_enum(
+            "DC", "AC", "DCLimit")),
+    )
+
     # Prepare acquisition
     def prepare_acquisition(self):
         """Prepare the acquisition."""
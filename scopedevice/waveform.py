@@ -0,0 +1,281 @@
+"""Provide numpy helpers to process the waveforms."""
+
+# Imports
+import time
+import numpy
+import threading
+import collections
+
+
+# Conversion helpers
+def probe_conversion(convert, channels, *args):
+    """Return the (gain, offset) factors of an affine conversion function.
+
+    The conversion is applied to a two-point probe for each channel,
+    so the factors are obtained without converting the actual data.
+    """
+    probe = dict((channel, numpy.array([0., 1.])) for channel in channels)
+    factors = {}
+    for channel, values in convert(probe, *args).items():
+        zero, one = values
+        factors[channel] = one - zero, zero
+    return factors
+
+
+def convert_waveform(raw, gain, offset, dtype=numpy.float64):
+    """Convert raw samples in a single pass and a single allocation."""
+    waveform = numpy.multiply(raw, gain, dtype=dtype)
+    waveform += offset
+    return waveform
+
+
+def binary_conversion(zero, per_div, scale, position):
+    """Return the (gain, offset) factors for binary ADC samples.
+
+    Args:
+        zero (float): ADC code of the center of the screen
+        per_div (float): number of ADC codes per division
+        scale (float): vertical scale in volts per division
+        position (float): vertical position in divisions
+    """
+    gain = scale / per_div
+    return gain, -(zero / per_div + position) * scale
+
+
+# Binary block helpers
+def parse_binary_block(block, dtype):
+    """Return a view on the payload of an IEEE 488.2 binary block.
+
+    The block must be the reply as received, since a decoded or stripped
+    reply would alter the samples. A block shorter than its header
+    announces raises a ValueError.
+    """
+    if not isinstance(block, bytes):
+        raise ValueError("The binary block has been decoded as text")
+    if block[:1] != "#":
+        raise ValueError("Not a binary block: {0!r}".format(block[:16]))
+    digits = int(block[1:2])
+    start = 2 + digits
+    if digits:
+        length = int(block[2:start])
+        if len(block) < start + length:
+            msg = "Truncated binary block: {0} bytes instead of {1}"
+            raise ValueError(msg.format(len(block) - start, length))
+    else:
+        length = len(block) - start - block.endswith("\n")
+    dtype = numpy.dtype(dtype)
+    return numpy.frombuffer(block, dtype, length // dtype.itemsize, start)
+
+
+def parse_binary_blocks(blocks, dtype):
+    """Parse a dictionary of binary blocks without copying the samples."""
+    return dict((channel, parse_binary_block(block, dtype))
+                for channel, block in blocks.items())
+
+
+def split_segments(raw, count, length=None):
+    """Return a (count, length) view on the samples of a segmented
+    acquisition.
+
+    A ValueError is raised if the samples do not match the given
+    record length, or cannot be split evenly if it is unknown.
+    """
+    if length is None:
+        length = len(raw) // count
+    if len(raw) != count * length:
+        msg = "Expected {0} segments of {1} samples, got {2} samples"
+        raise ValueError(msg.format(count, length, len(raw)))
+    return raw.reshape(count, length)
+
+
+# Time base cache
+class LinspaceCache(object):
+    """Small cache of numpy.linspace arrays keyed on their arguments.
+
+    The arrays are only computed when requested and released once they
+    have not been accessed for `lifetime` seconds.
+    """
+
+    def __init__(self, lifetime, size=2):
+        """Initialize the cache."""
+        self.lifetime = lifetime
+        self.size = size
+        self.lock = threading.Lock()
+        self.arrays = collections.OrderedDict()
+        self.accessed = {}
+
+    def get(self, args):
+        """Return the linspace array for the given arguments."""
+        with self.lock:
+            try:
+                array = self.arrays.pop(args)
+            except KeyError:
+                array = numpy.linspace(*args)
+            self.arrays[args] = array
+            self.accessed[args] = time.time()
+            while len(self.arrays) > self.size:
+                self.discard(next(iter(self.arrays)))
+            return array
+
+    def discard(self, args):
+        """Discard the array for the given arguments (lock must be held)."""
+        self.arrays.pop(args, None)
+        self.accessed.pop(args, None)
+
+    def release(self):
+        """Release the arrays that have not been accessed recently."""
+        limit = time.time() - self.lifetime
+        with self.lock:
+            for args, accessed in list(self.accessed.items()):
+                if accessed < limit:
+                    self.discard(args)
+
+
+# Display helpers
+def envelope_edges(length, buckets):
+    """Return the start index of each bucket of an envelope."""
+    edges = numpy.linspace(0, length, buckets, endpoint=False)
+    return edges.astype(numpy.intp)
+
+
+def envelope(waveform, edges):
+    """Return the min/max envelope of a waveform over the given buckets.
+
+    The minimum and maximum of each bucket are interleaved, so glitches
+    shorter than a bucket are preserved.
+    """
+    result = numpy.empty(2 * len(edges), dtype=waveform.dtype)
+    numpy.minimum.reduceat(waveform, edges, out=result[0::2])
+    numpy.maximum.reduceat(waveform, edges, out=result[1::2])
+    return result
+
+
+# Statistics
+statistics = collections.namedtuple(
+    "statistics", ("mean", "rms", "min", "max", "peak_to_peak", "std"))
+
+
+def waveform_statistics(raw, gain, offset):
+    """Compute the statistics of a waveform from its raw samples.
+
+    The reductions run on the raw samples without temporary arrays,
+    and the results are converted using the affine conversion factors.
+    """
+    count = float(len(raw))
+    low, high = gain * raw.min() + offset, gain * raw.max() + offset
+    low, high = min(low, high), max(low, high)
+    raw_mean = raw.sum(dtype=numpy.float64) / count
+    raw_square = numpy.einsum("i,i", raw, raw, dtype=numpy.float64) / count
+    std = abs(gain) * max(raw_square - raw_mean ** 2, 0.0) ** 0.5
+    mean = gain * raw_mean + offset
+    rms = (std ** 2 + mean ** 2) ** 0.5
+    return statistics(mean, rms, low, high, high - low, std)
+
+
+# Accumulation
+class Accumulator(object):
+    """Accumulate the successive waveforms of a channel in place.
+
+    The available modes are:
+     - NONE: no accumulation
+     - AVERAGE: running average over the last `count` waveforms
+     - EXPONENTIAL: exponential average with a 1/count weight
+     - MIN_HOLD: minimum of the waveforms
+     - MAX_HOLD: maximum of the waveforms
+
+    The running average keeps the last raw samples in their native
+    type along with their exact sum, and the count is capped so the
+    ring fits in `memory` bytes. The state arrays are allocated when
+    the settings, the sample shape or the conversion factors change,
+    and then updated in place. On a MemoryError, the state is released
+    before the error is raised. The reset is thread-safe: it waits for
+    the accumulation in progress to complete.
+    """
+
+    NONE, AVERAGE, EXPONENTIAL, MIN_HOLD, MAX_HOLD = range(5)
+
+    def __init__(self, memory=None):
+        """Initialize the accumulator."""
+        self.memory = memory
+        self.lock = threading.Lock()
+        self.clear()
+
+    def reset(self):
+        """Restart the accumulation with the next waveform."""
+        with self.lock:
+            self.clear()
+
+    def clear(self):
+        """Release the state arrays."""
+        self.key = None
+        self.state = None
+        self.ring = None
+
+    def get_count(self, raw, count):
+        """Return the count capped by the memory of the ring."""
+        count = max(count, 1)
+        if self.memory and raw.nbytes:
+            count = min(count, max(self.memory // raw.nbytes, 1))
+        return count
+
+    def allocate(self, key, raw, waveform):
+        """Allocate the state arrays."""
+        mode, count = key[:2]
+        self.clear()
+        self.index = 0
+        self.filled = 0
+        try:
+            if mode == self.AVERAGE:
+                exact = raw.dtype.kind in "biu"
+                dtype = numpy.int64 if exact else numpy.float64
+                self.state = numpy.zeros(raw.shape, dtype)
+                self.ring = numpy.empty((count,) + raw.shape, raw.dtype)
+            else:
+                self.state = waveform.copy()
+        except MemoryError:
+            self.clear()
+            raise
+        self.key = key
+
+    def apply(self, raw, waveform, gain, offset, mode, count):
+        """Accumulate a waveform and return the result.
+
+        The waveform is converted from the raw samples with the (gain,
+        offset) factors, and it is modified in place.
+        """
+        if mode == self.NONE or not len(waveform):
+            return waveform
+        with self.lock:
+            return self.accumulate(raw, waveform, gain, offset, mode, count)
+
+    def accumulate(self, raw, waveform, gain, offset, mode, count):
+        """Accumulate a waveform, with the lock acquired."""
+        count = self.get_count(raw, count)
+        key = mode, count, raw.shape, raw.dtype, waveform.dtype, gain, offset
+        if key != self.key:
+            self.allocate(key, raw, waveform)
+            if mode != self.AVERAGE:
+                return waveform
+        # Running average
+        if mode == self.AVERAGE:
+            if self.filled == count:
+                self.state -= self.ring[self.index]
+            self.ring[self.index] = raw
+            self.state += raw
+            self.filled = min(self.filled + 1, count)
+            self.index = (self.index + 1) % count
+            numpy.multiply(self.state, gain / self.filled, out=waveform)
+            waveform += offset
+            return waveform
+        # Exponential average
+        if mode == self.EXPONENTIAL:
+            waveform -= self.state
+            waveform *= 1.0 / count
+            waveform += self.state
+        # Min and max hold
+        elif mode == self.MIN_HOLD:
+            numpy.minimum(waveform, self.state, out=waveform)
+        elif mode == self.MAX_HOLD:
+            numpy.maximum(waveform, self.state, out=waveform)
+        self.state[...] = waveform
+        return waveform
@@ -73,6 +73,7 @@ setup(
     cmdclass={'upload_pages': UploadPages},
     setup_requires=['pytest-runner'],
     install_requires=['PyTango', 'python-rohdescope>=0.4.8'],
+    extras_require={'hdf5': ['h5py'], 'lz4': ['lz4']},
     tests_require=['mock', 'python-devicetest', 'pytest'],
     dependency_links=[
         'git+https://github.com/vxgmichel/pytango-devicetest.git'
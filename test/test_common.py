@@ -0,0 +1,282 @@
+"""Contain the tests for the common helpers."""
+
+# Imports
+import time
+import threading
+from Queue import Full
+from unittest import TestCase
+from scopedevice.common import (AcquisitionQueue, EventRateLimiter,
+                                DeadlineScheduler, RequestQueueDevice,
+                                event_property, join_commands, split_reply,
+                                scpi_int, scpi_bool, scpi_enum)
+
+
+# SCPI helpers
+class SCPITestCase(TestCase):
+    """Test the SCPI message helpers and reply parsers."""
+
+    def test_join_commands(self):
+        commands = ["TIMebase:RANGe?", " :ACQuire:POINts? ", "*OPC?"]
+        self.assertEqual(join_commands(commands),
+                         ":TIMebase:RANGe?;:ACQuire:POINts?;*OPC?")
+
+    def test_split_reply(self):
+        self.assertEqual(split_reply("1.5;2E3;ON\n", 3),
+                         ["1.5", "2E3", "ON"])
+        for reply, count in (("1.5;2E3", 3), ("", 2), ("1;2;3", 2)):
+            with self.assertRaises(ValueError):
+                split_reply(reply, count)
+
+    def test_scalars(self):
+        self.assertEqual(scpi_int("2.5E+3"), 2500)
+        self.assertTrue(scpi_bool(" on"))
+        self.assertFalse(scpi_bool("0\n"))
+        with self.assertRaises(ValueError):
+            scpi_bool("2")
+
+    def test_enum(self):
+        parse = scpi_enum("POSitive", None, "NEGative")
+        self.assertEqual(parse("POS"), 0)
+        self.assertEqual(parse("positive\n"), 0)
+        self.assertEqual(parse('"NEG"'), 2)
+        for reply in ("", "P", "EITHer"):
+            with self.assertRaises(ValueError):
+                parse(reply)
+
+
+# Acquisition queue
+class AcquisitionQueueTestCase(TestCase):
+    """Test the overflow policies of the acquisition queue."""
+
+    def fill(self, queue, count):
+        for item in range(count):
+            queue.put(item, timeout=0.01)
+
+    def drain(self, queue):
+        items = []
+        while not queue.empty():
+            items.append(queue.get())
+        return items
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            AcquisitionQueue(2, "drop_newest")
+
+    def test_block(self):
+        queue = AcquisitionQueue(2, "block")
+        self.fill(queue, 2)
+        with self.assertRaises(Full):
+            queue.put(2, timeout=0.01)
+        self.assertEqual(self.drain(queue), [0, 1])
+        self.assertEqual(queue.dropped, 0)
+
+    def test_drop_oldest(self):
+        queue = AcquisitionQueue(2, "drop_oldest")
+        self.fill(queue, 5)
+        self.assertEqual(self.drain(queue), [3, 4])
+        self.assertEqual(queue.dropped, 3)
+
+    def test_keep_latest(self):
+        queue = AcquisitionQueue(2, "keep_latest")
+        self.fill(queue, 5)
+        self.assertEqual(self.drain(queue), [4])
+        self.assertEqual(queue.dropped, 4)
+
+    def test_unbounded(self):
+        queue = AcquisitionQueue(0, "drop_oldest")
+        self.fill(queue, 5)
+        self.assertEqual(self.drain(queue), list(range(5)))
+        self.assertEqual(queue.dropped, 0)
+
+    def test_interrupt(self):
+        queue = AcquisitionQueue(1, "block")
+        self.fill(queue, 1)
+        queue.interrupt()
+        self.assertEqual(self.drain(queue), [0, None])
+        self.assertEqual(queue.dropped, 0)
+
+
+# Deadline scheduler
+class DeadlineSchedulerTestCase(TestCase):
+    """Test the deadlines and the statistics of the scheduled tasks."""
+
+    def setUp(self):
+        self.now = 100.0
+        self.scheduler = DeadlineScheduler(clock=self.clock)
+        self.calls = []
+
+    def clock(self):
+        return self.now
+
+    def task(self, name, duration=0.0):
+        def func():
+            self.calls.append(name)
+            self.now += duration
+        return func
+
+    def test_deadline(self):
+        task = self.scheduler.add("task", self.task("task"), 1.0)
+        self.scheduler.run_pending()
+        self.assertEqual(task.deadline, 101.0)
+        self.now = 101.25
+        self.scheduler.run_pending()
+        self.assertEqual(task.deadline, 102.0)
+        self.assertEqual(task.jitter, 0.25)
+        self.assertEqual(task.runs, 2)
+        self.assertEqual(task.overruns, 0)
+        self.now = 101.5
+        self.scheduler.run_pending()
+        self.assertEqual(task.runs, 2)
+
+    def test_overrun(self):
+        task = self.scheduler.add("task", self.task("task", 2.5), 1.0)
+        self.scheduler.run_pending()
+        self.assertEqual(self.now, 102.5)
+        self.assertEqual(task.deadline, 103.0)
+        self.assertEqual(task.overruns, 1)
+        self.assertEqual(task.duration, 2.5)
+
+    def test_priority(self):
+        self.scheduler.add("low", self.task("low"), 1.0, priority=2)
+        self.scheduler.add("high", self.task("high"), 1.0, priority=1)
+        self.scheduler.run_pending()
+        self.assertEqual(self.calls, ["high", "low"])
+
+    def test_disabled(self):
+        enabled = [False]
+        task = self.scheduler.add(
+            "task", self.task("task"), 1.0, enabled=lambda: enabled[0])
+        self.scheduler.run_pending()
+        self.assertEqual(self.calls, [])
+        self.assertIsNone(self.scheduler.next_deadline())
+        self.now, enabled[0] = 100.5, True
+        self.scheduler.run_pending()
+        self.assertEqual(self.calls, ["task"])
+        self.assertEqual(task.deadline, 101.5)
+
+    def test_wakeup(self):
+        scheduler = DeadlineScheduler()
+        scheduler.add("task", self.task("task"), 60.0)
+        scheduler.run_pending()
+        timer = threading.Timer(0.05, scheduler.wakeup.set)
+        timer.start()
+        start = time.time()
+        scheduler.wait()
+        timer.join()
+        self.assertLess(time.time() - start, 30.0)
+        self.assertFalse(scheduler.wakeup.is_set())
+
+
+# Request queue
+class RequestQueueTestCase(TestCase):
+    """Test the coalescing of the keyed requests."""
+
+    def setUp(self):
+        self.device = RequestQueueDevice.__new__(RequestQueueDevice)
+        self.device.init_request_queue()
+        self.calls = []
+
+    def task(self, value):
+        self.calls.append(value)
+
+    def test_replacement(self):
+        device = self.device
+        device.enqueue_keyed("key", self.task, 1)
+        device.enqueue(self.task, "barrier")
+        device.enqueue_keyed("other", self.task, 2)
+        device.enqueue_keyed("other", self.task, 3)
+        self.assertEqual(len(device.request_queue), 3)
+        device.process_queue()
+        self.assertEqual(self.calls, [1, "barrier", 3])
+        self.assertEqual(device.queue_statistics.coalesced, 1)
+
+    def test_barrier(self):
+        device = self.device
+        device.enqueue_keyed("key", self.task, 1)
+        device.enqueue(self.task, "barrier")
+        device.enqueue_keyed("key", self.task, 2)
+        device.process_queue()
+        self.assertEqual(self.calls, [1, "barrier", 2])
+        self.assertEqual(device.queue_statistics.coalesced, 0)
+
+    def test_started(self):
+        device = self.device
+
+        def task():
+            self.task(1)
+            device.enqueue_keyed("key", self.task, 2)
+        device.enqueue_keyed("key", task)
+        device.process_queue()
+        self.assertEqual(self.calls, [1, 2])
+        self.assertEqual(device.queue_statistics.coalesced, 0)
+        self.assertEqual(device.pending_requests, {})
+
+    def test_statistics(self):
+        device = self.device
+        device.enqueue(self.task, 1)
+        device.request_queue[0].stamp -= 0.5
+        device.enqueue(self.task, 2)
+        device.process_queue()
+        statistics = device.queue_statistics
+        self.assertEqual(statistics.count, 2)
+        self.assertGreaterEqual(statistics.max, 0.5)
+        self.assertLess(statistics.last, 0.5)
+        self.assertLess(statistics.mean, statistics.max)
+
+
+# Event rate limiter
+class EventRateLimiterTestCase(TestCase):
+    """Test the coalescing of the change events."""
+
+    def setUp(self):
+        self.limiter = EventRateLimiter()
+        self.flushed = threading.Event()
+
+    def tearDown(self):
+        self.limiter.stop(1.0)
+
+    def test_coalescing(self):
+        allow = self.limiter.allow
+        self.assertTrue(allow("key", "group", 10.0, self.flushed.set))
+        self.assertFalse(allow("key", "group", 10.0, self.flushed.set))
+        self.assertFalse(allow("key", "group", 10.0, self.flushed.set))
+        self.assertTrue(allow("other", "group", 10.0, self.flushed.set))
+        self.assertEqual(self.limiter.suppressed["group"], 1)
+        self.limiter.flush()
+        self.assertFalse(self.flushed.is_set())
+
+    def test_flushing_thread(self):
+        self.limiter.start()
+        allow = self.limiter.allow
+        self.assertTrue(allow("key", "group", 0.05, self.flushed.set))
+        self.assertFalse(allow("key", "group", 0.05, self.flushed.set))
+        self.assertTrue(self.flushed.wait(1.0))
+        self.assertEqual(self.limiter.pending, {})
+
+
+# Event property
+class ChangedTestCase(TestCase):
+    """Test the change detection of the event properties."""
+
+    class Array(object):
+        """Minimal array exposing its dimensions and size."""
+
+        def __init__(self, size):
+            self.ndim, self.size = 1, size
+
+    def test_scalars(self):
+        self.assertFalse(event_property.changed(1.5, 1.5))
+        self.assertTrue(event_property.changed(1.5, 2.5))
+        self.assertTrue(event_property.changed(None, 2.5))
+
+    def test_arrays(self):
+        array = self.Array(10)
+        self.assertFalse(event_property.changed(array, array))
+        self.assertTrue(event_property.changed(array, self.Array(10)))
+        self.assertTrue(event_property.changed(None, array))
+        self.assertTrue(event_property.changed(array, self.Array(0)))
+
+    def test_empty_arrays(self):
+        self.assertFalse(
+            event_property.changed(self.Array(0), self.Array(0)))
+        self.assertTrue(event_property.changed(None, self.Array(0)))
@@ -0,0 +1,59 @@
+"""Contain the tests for the decoding helpers."""
+
+# Imports
+import os
+import numpy
+import shutil
+import tempfile
+import subprocess
+from unittest import TestCase
+from scopedevice.decoding import (export_array, import_array,
+                                  remove_exported, remove_stale_exports)
+
+
+# Shared memory helpers
+class SharedMemoryTestCase(TestCase):
+    """Test the hand-over of the arrays through files."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def export(self, prefix="scopedevice-"):
+        array = numpy.arange(10, dtype="int16")
+        return export_array(array, self.directory, prefix)
+
+    def test_round_trip(self):
+        array = numpy.linspace(-1, 1, 100)
+        path = export_array(array, self.directory)
+        self.assertTrue(os.path.exists(path))
+        result = import_array(path)
+        self.assertEqual(result.dtype, array.dtype)
+        self.assertEqual(result.tolist(), array.tolist())
+        self.assertFalse(os.path.exists(path))
+
+    def test_passthrough(self):
+        empty = export_array([], self.directory)
+        self.assertEqual(len(empty), 0)
+        self.assertIs(import_array(empty), empty)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_remove_exported(self):
+        kept = self.export("scopedevice-1-0-")
+        for _ in range(3):
+            self.export("scopedevice-1-1-")
+        remove_exported("scopedevice-1-1-", self.directory)
+        self.assertEqual(os.listdir(self.directory),
+                         [os.path.basename(kept)])
+
+    def test_remove_stale_exports(self):
+        process = subprocess.Popen(["true"])
+        process.wait()
+        prefix = "scopedevice-{0}-0-"
+        stale = self.export(prefix.format(process.pid))
+        alive = self.export(prefix.format(os.getpid()))
+        remove_stale_exports(self.directory)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(alive))
@@ -4,6 +4,7 @@
 import scopedevice
 from time import sleep
 from mock import MagicMock
+from unittest import TestCase
 from PyTango import DevState
 from itertools import product
 from collections import defaultdict
@@ -25,14 +26,18 @@ PRECISION = 5
 # Here, we use a factor 4 between the read period and the sleep calls.
 
 
-# Device test case
-class ScopeDeviceTestCase(DeviceTestCase):
-    """Test case for packet generation."""
+# Base device test case
+class BaseScopeDeviceTestCase(DeviceTestCase):
+    """Mock the libraries and connect the device."""
 
     device = scopedevice.ScopeDevice
     properties = {'Host': '1.2.3.4',
                   'SettingsEvents': False,
-                  'WaveformEvents': False}
+                  'WaveformEvents': False,
+                  'StatusPeriod': 0,
+                  'HorizontalPeriod': 0,
+                  'TriggerPeriod': 0,
+                  'VerticalPeriod': 0}
     empty = None  # Should be []
     debug = 2
 
@@ -71,6 +76,7 @@ class ScopeDeviceTestCase(DeviceTestCase):
         """Mock external libraries."""
         # Mock numpy
         cls.numpy = scopedevice.device.numpy = MagicMock()
+        scopedevice.waveform.numpy = cls.numpy
         cls.numpy.linspace.return_value = []
         # Mock rtm library
         cls.connection = scopedevice.ScopeDevice.connection_class = MagicMock()
@@ -85,6 +91,9 @@ class ScopeDeviceTestCase(DeviceTestCase):
         cls.instrument.get_time_position.return_value = 0
         cls.instrument.stamp_acquisition.return_value = "", 0
         cls.instrument.decode_waveforms.return_value = defaultdict(list)
+        cls.instrument.parse_waveform_string.return_value = {}
+        cls.instrument.get_waveform_data.return_value = {}
+        cls.instrument.convert_waveforms.return_value = {}
 
     def setUp(self):
         """Let the inner thread initialize the device."""
@@ -92,6 +101,11 @@ class ScopeDeviceTestCase(DeviceTestCase):
         self.device.Connect()
         sleep(UPDATE)
 
+
+# Device test case
+class ScopeDeviceTestCase(BaseScopeDeviceTestCase):
+    """Test case for packet generation."""
+
     def test_properties(self):
         self.assertEquals("Some ID", self.device.Identifier)
         self.assertIn("Some status", self.device.status())
@@ -134,8 +148,9 @@ class ScopeDeviceTestCase(DeviceTestCase):
         # Check
         arg = self.instrument.set_time_range.call_args[0][0]
         self.assertEqual(write_range, arg)
-        self.numpy.linspace.assert_called_with(*expected_args)
         self.assertEqual(list(self.device.TimeBase), read_scale)
+        self.numpy.linspace.assert_called_with(*expected_args,
+                                               dtype="float64")
         # Change read scale
         new_read_scale = [1 + x*0.2 for x in range(100)]
         self.numpy.linspace.return_value = new_read_scale
@@ -150,8 +165,12 @@ class ScopeDeviceTestCase(DeviceTestCase):
         # Wait
         sleep(UPDATE)
         # Change detected
-        self.numpy.linspace.assert_called_with(*expected_args)
         self.assertEqual(list(self.device.TimeBase), new_read_scale)
+        self.numpy.linspace.assert_called_with(*expected_args,
+                                               dtype="float64")
+        # Time base parameters
+        self.assertEquals(-0.005, self.device.TimeBaseStart)
+        self.assertEquals(0, self.device.TimeBaseLength)
 
     def test_acquisition(self):
         # Check initial state
@@ -167,3 +186,99 @@ class ScopeDeviceTestCase(DeviceTestCase):
         self.device.stop()
         sleep(UPDATE)
         self.assertEquals(DevState.ON, self.device.state())
+
+    def test_batched_polling_fallback(self):
+        get_time_range = self.instrument.get_time_range
+        # Unexpected reply to the batched queries
+        self.instrument.issue_command.return_value = "garbage"
+        get_time_range.reset_mock()
+        sleep(UPDATE)
+        # The settings are polled one by one
+        self.assertTrue(get_time_range.called)
+        self.assertEquals(DevState.ON, self.device.state())
+
+    def test_decoding_queue(self):
+        # Check initial counters
+        self.assertEquals(0, self.device.DroppedAcquisitions)
+        self.assertEquals(0, self.device.DecodingQueueDepth)
+        # Run and stop acquisitions
+        self.device.run()
+        sleep(UPDATE)
+        self.device.stop()
+        sleep(UPDATE)
+        # The queue has been emptied
+        self.assertEquals(0, self.device.DecodingQueueDepth)
+
+
+# Event-driven polling test case
+class EventDrivenPollingTestCase(BaseScopeDeviceTestCase):
+    """Test the settings refresh in event-driven mode."""
+
+    properties = dict(BaseScopeDeviceTestCase.properties,
+                      EventDrivenPolling=True,
+                      BatchedPolling=False,
+                      SafetyPollPeriod=1000.0,
+                      LocalPollDuration=0.5)
+
+    def test_refresh(self):
+        get_time_range = self.instrument.get_time_range
+        # No event
+        self.instrument.issue_command.return_value = "0"
+        get_time_range.reset_mock()
+        sleep(UPDATE)
+        self.assertFalse(get_time_range.called)
+        # User request
+        self.instrument.issue_command.return_value = "64"
+        sleep(UPDATE)
+        self.instrument.issue_command.return_value = "0"
+        # Periodic polling for LocalPollDuration
+        get_time_range.reset_mock()
+        sleep(UPDATE)
+        self.assertTrue(get_time_range.called)
+        sleep(0.5)
+        get_time_range.reset_mock()
+        sleep(UPDATE)
+        self.assertFalse(get_time_range.called)
+
+
+# Polling schedule test case
+class PollingDueTestCase(TestCase):
+    """Test the polling schedule of the settings groups."""
+
+    def setUp(self):
+        self.device = scopedevice.ScopeDevice.__new__(scopedevice.ScopeDevice)
+        self.device.polling_stamps = {}
+        self.device.update_period = 0.25
+
+    def test_jitter(self):
+        period = self.device.update_period
+        polls = [now for now in (0.0, 0.49, 0.51, 0.99, 1.26)
+                 if self.device.polling_due("group", 2 * period, now)]
+        self.assertEqual(polls, [0.0, 0.49, 0.99])
+
+
+# Batched polling test case
+class BatchedPollingTestCase(TestCase):
+    """Test the fallback of the batched settings polling."""
+
+    def setUp(self):
+        self.device = scopedevice.ScopeDevice.__new__(scopedevice.ScopeDevice)
+        self.device.batched_polling = True
+        self.device.scope = MagicMock()
+        self.device.update_time_range = MagicMock()
+        self.device.warn_stream = MagicMock()
+        self.device.debug_stream = MagicMock()
+
+    def test_invalid_reply(self):
+        self.device.scope.issue_command.return_value = "1.0;2.0"
+        self.device.update_settings([("time_range", None)])
+        self.assertTrue(self.device.update_time_range.called)
+        self.assertFalse(self.device.batched_polling)
+
+    def test_timeout(self):
+        exc = scopedevice.device.Vxi11Exception(15, "timeout")
+        self.device.scope.issue_command.side_effect = exc
+        with self.assertRaises(scopedevice.device.Vxi11Exception):
+            self.device.update_settings([("time_range", None)])
+        self.assertFalse(self.device.update_time_range.called)
+        self.assertTrue(self.device.batched_polling)
@@ -0,0 +1,46 @@
+"""Contain the tests for the waveform encoding."""
+
+# Imports
+import json
+import numpy
+from unittest import TestCase
+from scopedevice.encoding import (encode_waveform, decode_waveform,
+                                  check_compression, compressors)
+
+
+# Encoding
+class EncodingTestCase(TestCase):
+    """Test the DevEncoded values of the waveforms."""
+
+    raw = numpy.array([-128, -1, 0, 1, 127] * 20, "int8")
+    gain, offset = 0.25, -1.5
+
+    def test_round_trip(self):
+        for compression in sorted(compressors):
+            encoded = encode_waveform(self.raw, self.gain, self.offset,
+                                      compression, sequence=3)
+            samples = decode_waveform(encoded, raw=True)
+            self.assertEqual(samples.dtype, self.raw.dtype)
+            self.assertEqual(samples.tolist(), self.raw.tolist())
+            waveform = decode_waveform(encoded)
+            expected = self.raw * self.gain + self.offset
+            self.assertEqual(waveform.tolist(), expected.tolist())
+
+    def test_metadata(self):
+        fmt, _ = encode_waveform(self.raw, self.gain, self.offset,
+                                 "zlib", 6, channel=2, sequence=3)
+        metadata = json.loads(fmt)
+        self.assertEqual(metadata["dtype"], "|i1")
+        self.assertEqual(metadata["length"], len(self.raw))
+        self.assertEqual(metadata["compression"], "zlib")
+        self.assertEqual(metadata["channel"], 2)
+        self.assertEqual(metadata["sequence"], 3)
+
+    def test_no_copy(self):
+        _, data = encode_waveform(self.raw, self.gain, self.offset)
+        self.assertIs(data, self.raw)
+
+    def test_invalid_compression(self):
+        check_compression("zlib")
+        with self.assertRaises(ValueError):
+            check_compression("gzip")
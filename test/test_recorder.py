@@ -0,0 +1,84 @@
+"""Contain the tests for the recorder."""
+
+# Imports
+import os
+import numpy
+import shutil
+import tempfile
+from unittest import TestCase
+from scopedevice.recorder import Recorder, resolve_path
+
+
+# Recording paths
+class ResolvePathTestCase(TestCase):
+    """Test that the recordings stay in the recording directory."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.root = os.path.realpath(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_inside(self):
+        for path, expected in [("run.h5", "run.h5"),
+                               ("a/b/run", "a/b/run"),
+                               ("a/../run", "run"),
+                               ("..run", "..run")]:
+            result = resolve_path(self.directory, path)
+            self.assertEqual(result, os.path.join(self.root, expected))
+
+    def test_outside(self):
+        os.symlink("/tmp", os.path.join(self.directory, "link"))
+        for path in ("", ".", "..", "../run", "a/../../run", "/tmp/run",
+                     "link/run"):
+            with self.assertRaises(ValueError):
+                resolve_path(self.directory, path)
+
+
+# Recorder
+class RecorderTestCase(TestCase):
+    """Test the chunks written by the recorder."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "run")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def load(self, chunk, name):
+        filename = "{0:05d}_{1}.npy".format(chunk, name)
+        return numpy.load(os.path.join(self.path, filename))
+
+    def test_chunks(self):
+        # Two int16 channels of 100 samples take 400 bytes per frame
+        recorder = Recorder(self.path, {}, chunk_memory=1000)
+        raw = numpy.arange(100, dtype="int16")
+        data = {1: raw, 2: raw + 1, 3: raw[:0]}
+        for sequence in range(5):
+            recorder.put(sequence, sequence * 0.1, data, {1: (2.0, 0.5)})
+        recorder.stop(1.0)
+        self.assertEqual(recorder.error, "")
+        self.assertEqual(recorder.chunk_size, 2)
+        self.assertEqual(recorder.samples.shape, (2, 2, 100))
+        self.assertEqual(recorder.dropped, 0)
+        # Chunks
+        self.assertEqual(self.load(0, "sequences").tolist(), [0, 1])
+        self.assertEqual(self.load(2, "sequences").tolist(), [4])
+        self.assertEqual(self.load(1, "waveform2")[1].tolist(),
+                         (raw + 1).tolist())
+        self.assertEqual(self.load(0, "factors1")[0].tolist(), [2.0, 0.5])
+        self.assertEqual(self.load(0, "factors2")[0].tolist(), [1.0, 0.0])
+        self.assertFalse(os.path.exists(
+            os.path.join(self.path, "00000_waveform3.npy")))
+
+    def test_rejected(self):
+        recorder = Recorder(self.path, {})
+        raw = numpy.arange(100, dtype="int16")
+        recorder.put(0, 0.0, {1: raw}, {})
+        recorder.put(1, 0.1, {1: raw, 2: raw}, {})
+        recorder.put(2, 0.2, {1: raw[:50]}, {})
+        recorder.stop(1.0)
+        self.assertEqual(recorder.dropped, 2)
+        self.assertEqual(self.load(0, "sequences").tolist(), [0])
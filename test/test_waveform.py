@@ -0,0 +1,161 @@
+"""Contain the tests for the waveform helpers."""
+
+# Imports
+import numpy
+import threading
+from unittest import TestCase
+from scopedevice import waveform
+from scopedevice.waveform import (parse_binary_block, parse_binary_blocks,
+                                  split_segments, convert_waveform,
+                                  Accumulator)
+
+
+# Base test case
+class WaveformTestCase(TestCase):
+    """Restore numpy, which is mocked by the device tests."""
+
+    def setUp(self):
+        waveform.numpy = numpy
+
+
+# Binary blocks
+class BinaryBlockTestCase(WaveformTestCase):
+    """Test the parsing of the IEEE 488.2 binary blocks."""
+
+    samples = numpy.array([-2, 10, 13, 300], "<i2")
+
+    def block(self, payload, terminator="\n"):
+        length = str(len(payload))
+        return "#" + str(len(length)) + length + payload + terminator
+
+    def test_definite_length(self):
+        block = self.block(self.samples.tobytes())
+        result = parse_binary_block(block, "<i2")
+        self.assertEqual(result.tolist(), self.samples.tolist())
+        self.assertFalse(result.flags.owndata)
+
+    def test_unsigned(self):
+        samples = numpy.array([0, 10, 32768, 65535], "<u2")
+        block = self.block(samples.tobytes())
+        result = parse_binary_block(block, "<u2")
+        self.assertEqual(result.tolist(), [0, 10, 32768, 65535])
+
+    def test_no_terminator(self):
+        block = self.block(self.samples.tobytes(), "")
+        result = parse_binary_block(block, "<i2")
+        self.assertEqual(result.tolist(), self.samples.tolist())
+
+    def test_indefinite_length(self):
+        payload = numpy.array([1, -1, 127], "i1").tobytes()
+        for terminator in ("", "\n"):
+            block = "#0" + payload + terminator
+            result = parse_binary_block(block, "i1")
+            self.assertEqual(result.tolist(), [1, -1, 127])
+
+    def test_truncated(self):
+        # A reply stripped of a trailing newline sample byte
+        samples = numpy.array([1, 2, 10], "i1")
+        block = self.block(samples.tobytes()).rstrip("\n")
+        with self.assertRaises(ValueError):
+            parse_binary_block(block, "i1")
+
+    def test_invalid(self):
+        for block in ("", "#", "1,2,3", u"#13abc"):
+            with self.assertRaises(ValueError):
+                parse_binary_block(block, "i1")
+
+    def test_blocks(self):
+        blocks = {1: self.block(self.samples.tobytes()),
+                  3: self.block("")}
+        result = parse_binary_blocks(blocks, "<i2")
+        self.assertEqual(sorted(result), [1, 3])
+        self.assertEqual(result[1].tolist(), self.samples.tolist())
+        self.assertEqual(len(result[3]), 0)
+
+
+# Segments
+class SplitSegmentsTestCase(WaveformTestCase):
+    """Test the split of the segmented acquisitions."""
+
+    def test_split(self):
+        raw = numpy.arange(12, dtype="int16")
+        for length in (None, 4):
+            result = split_segments(raw, 3, length)
+            self.assertEqual(result.shape, (3, 4))
+            self.assertEqual(result[-1].tolist(), [8, 9, 10, 11])
+            self.assertFalse(result.flags.owndata)
+
+    def test_mismatch(self):
+        raw = numpy.arange(12, dtype="int16")
+        for count, length in ((5, None), (3, 5), (4, 4)):
+            with self.assertRaises(ValueError):
+                split_segments(raw, count, length)
+
+
+# Accumulation
+class AccumulatorTestCase(WaveformTestCase):
+    """Test the running average of the raw samples."""
+
+    gain, offset = 0.5, -1.0
+
+    def apply(self, accumulator, raw, count, dtype="float64"):
+        waveform = convert_waveform(raw, self.gain, self.offset, dtype)
+        return accumulator.apply(raw, waveform, self.gain, self.offset,
+                                 Accumulator.AVERAGE, count)
+
+    def test_average(self):
+        accumulator = Accumulator()
+        raws = [numpy.array([i, 2 * i, -i], "int16") for i in range(5)]
+        for raw in raws:
+            result = self.apply(accumulator, raw, 3)
+        expected = numpy.mean(raws[-3:], axis=0) * self.gain + self.offset
+        self.assertTrue(numpy.allclose(result, expected))
+        self.assertEqual(accumulator.ring.dtype, numpy.int16)
+        self.assertEqual(accumulator.state.dtype, numpy.int64)
+
+    def test_float32(self):
+        accumulator = Accumulator()
+        raw = numpy.array([1, 2, 3], "int8")
+        result = self.apply(accumulator, raw, 3, "float32")
+        result = self.apply(accumulator, raw, 3, "float32")
+        self.assertEqual(result.dtype, numpy.float32)
+        self.assertEqual(result.tolist(), [-0.5, 0.0, 0.5])
+
+    def test_memory(self):
+        raw = numpy.zeros(1000, "int16")
+        accumulator = Accumulator(memory=3 * raw.nbytes)
+        self.apply(accumulator, raw, 100)
+        self.assertEqual(accumulator.ring.shape, (3, 1000))
+
+    def test_factors_change(self):
+        accumulator = Accumulator()
+        raw = numpy.array([10, 20], "int16")
+        self.apply(accumulator, raw, 10)
+        self.apply(accumulator, raw * 0, 10)
+        self.gain = 1.0
+        result = self.apply(accumulator, raw, 10)
+        self.assertEqual(result.tolist(), [9.0, 19.0])
+
+    def test_concurrent_reset(self):
+        accumulator = Accumulator()
+        raw = numpy.arange(10000, dtype="int16")
+        errors = []
+        resetting = threading.Event()
+
+        def run():
+            try:
+                for _ in range(200):
+                    self.apply(accumulator, raw, 10)
+                    resetting.set()
+            except Exception as exc:
+                errors.append(exc)
+        thread = threading.Thread(target=run)
+        thread.start()
+        resetting.wait(1.0)
+        while thread.is_alive():
+            accumulator.reset()
+        thread.join()
+        self.assertEqual(errors, [])
+        result = self.apply(accumulator, raw, 10)
+        expected = raw * self.gain + self.offset
+        self.assertTrue(numpy.allclose(result, expected))